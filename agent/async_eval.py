@@ -0,0 +1,141 @@
+# Greedy evaluation of training snapshots in background processes
+#
+#     evaluator = AsyncEvaluator({'rows': 5, 'cols': 10})
+#     train_dqn_agent(episodes=1000, evaluator=evaluator, eval_freq=50)
+#
+# The learner only copies the weights and hands them over with put_nowait; if
+# the evaluators are still busy the snapshot is dropped, never waited for.
+import os
+import json
+import time
+import queue
+import random
+import multiprocessing as mp
+import numpy as np
+import torch
+from agent.dqn import network_spec
+
+
+def evaluate_agent(agent, env, episodes, seed=0):
+    """Average reward, occupancy and success rate of greedy episodes.
+
+    Episode i is seeded with seed + i, so every snapshot is scored on the same
+    arrivals and their averages can be compared.
+    """
+    rewards, occupancies, success = [], [], []
+    for i in range(episodes):
+        random.seed(seed + i)
+        if env.arrivals:
+            env.arrivals.rng = np.random.default_rng(seed + i)
+        state = env.reset()
+        total = 0.0
+        info = {'occupancy': 0.0, 'parked': 0, 'failed': 0}
+        while env.current_car is not None:
+            available = env.get_available_actions()
+            if not available:
+                break
+            state, reward, done, info = env.step(agent.choose_action(state, available))
+            total += reward
+            if done:
+                break
+        rewards.append(total)
+        occupancies.append(info['occupancy'])
+        attempts = info['parked'] + info['failed']
+        success.append(info['parked'] / attempts if attempts else 0)
+    return {'avg_reward': float(np.mean(rewards)), 'avg_occupancy': float(np.mean(occupancies)),
+            'avg_success_rate': float(np.mean(success))}
+
+
+def _worker(snapshots, results, env_kwargs, episodes, log_path, best_path, best_reward, lock):
+    from agent.environment import ParkingLotEnv
+    from agent.dqn import build_network, greedy_agent
+    torch.set_num_threads(1)  # leave the other cores to the learner
+    env = ParkingLotEnv(**env_kwargs)
+    agent, agent_spec = None, None
+    while True:
+        item = snapshots.get()
+        if item is None:
+            break
+        episode, spec, state_dict = item
+        if spec != agent_spec:
+            # The network class and size come with the snapshot (fully connected or grid)
+            agent = greedy_agent(spec, env.rows, env.cols, build_network(spec, env.rows, env.cols))
+            agent_spec = spec
+        agent.q_network.load_state_dict(state_dict)
+        if spec['kind'] == 'dqn':
+            agent.enable_incremental()
+        start = time.perf_counter()
+        result = evaluate_agent(agent, env, episodes)
+        result.update(episode=episode, seconds=time.perf_counter() - start, best=False)
+        with lock:
+            if result['avg_reward'] > best_reward.value:
+                best_reward.value = result['avg_reward']
+                result['best'] = True
+                if best_path:
+                    torch.save(state_dict, best_path + '.tmp')
+                    os.replace(best_path + '.tmp', best_path)
+            if log_path:
+                with open(log_path, 'a') as f:
+                    f.write(json.dumps(result) + '\n')
+        results.put(result)
+
+
+class AsyncEvaluator:
+    """Evaluate DQNAgent.q_network snapshots on `processes` background workers.
+
+    Each result (avg_reward, avg_occupancy, avg_success_rate, episode, ...) is
+    appended as a JSON line to `log_path` and returned by poll(). The best
+    snapshot so far is saved to `best_path` (written to a temporary file and
+    renamed, so the file is always a complete checkpoint).
+    """
+    def __init__(self, env_kwargs=None, episodes=20, processes=1, log_path='models/eval_log.jsonl',
+                 best_path='models/dqn_parking_best.pth'):
+        for path in (log_path, best_path):
+            if path and os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+        ctx = mp.get_context('spawn')  # no forked copy of the learner's torch state
+        self.snapshots = ctx.Queue(maxsize=processes)
+        self.results = ctx.Queue()
+        self.best_reward = ctx.Value('d', float('-inf'))
+        self.lock = ctx.Lock()  # kept referenced: spawned workers attach to it after __init__ returns
+        self.submitted = 0
+        self.dropped = 0
+        self.workers = [ctx.Process(target=_worker, daemon=True,
+                                    args=(self.snapshots, self.results, env_kwargs or {}, episodes,
+                                          log_path, best_path, self.best_reward, self.lock))
+                        for _ in range(processes)]
+        for worker in self.workers:
+            worker.start()
+
+    def submit(self, episode, network):
+        """Queue a copy of `network`'s weights; returns False if the workers are busy"""
+        state_dict = {k: v.detach().cpu().clone() for k, v in network.state_dict().items()}
+        try:
+            self.snapshots.put_nowait((episode, network_spec(state_dict), state_dict))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.submitted += 1
+        return True
+
+    def poll(self):
+        """Results finished since the last call, without waiting"""
+        done = []
+        while True:
+            try:
+                done.append(self.results.get_nowait())
+            except queue.Empty:
+                return done
+
+    def close(self):
+        """Let queued snapshots finish, stop the workers and return their last results"""
+        for worker in self.workers:
+            if worker.is_alive():
+                self.snapshots.put(None)
+        done = []
+        for worker in self.workers:
+            while worker.is_alive():
+                done.extend(self.poll())  # keep the result pipe drained so workers can exit
+                worker.join(0.1)
+        done.extend(self.poll())
+        return done
@@ -0,0 +1,229 @@
+# Offline transition datasets: log any policy to sharded memory-mapped files and
+# stream-sample them to prefill or pretrain DQNAgent without loading them into RAM
+#
+#     python -m agent.dataset data/nearest --policy nearest --episodes 20000
+import os
+import json
+import random
+import argparse
+import numpy as np
+from numpy.lib.format import open_memmap
+from agent.observation import N_FEATURES, pack_states, unpack_states
+from agent.policies import random_policy, nearest_policy, balanced_policy
+
+# name -> (shape after the row axis, dtype); grids are bit-packed as in CompactReplayMemory
+def _columns(n_slots, n_features):
+    n_bytes = (n_slots + 7) // 8
+    return {
+        'states': ((n_bytes,), np.uint8),
+        'features': ((n_features,), np.float32),
+        'next_states': ((n_bytes,), np.uint8),
+        'next_features': ((n_features,), np.float32),
+        'actions': ((), np.int64),
+        'rewards': ((), np.float32),
+        'dones': ((), np.bool_),
+    }
+
+
+class TransitionWriter:
+    """Append transitions to fixed-size .npy shards under `directory`.
+
+    Each shard is a subdirectory of preallocated memory-mapped columns. The
+    number of valid rows per shard lives in index.json, which is rewritten
+    atomically whenever a shard fills up and on close(), so readers only ever
+    see complete rows. Opening an existing dataset appends new shards to it.
+    """
+    def __init__(self, directory, state_size, shard_size=1_000_000, n_features=N_FEATURES):
+        self.directory = directory
+        self.n_slots = state_size - n_features
+        self.n_features = n_features
+        self.shard_size = shard_size
+        os.makedirs(directory, exist_ok=True)
+        self.index = _read_index(directory) or {'n_slots': self.n_slots, 'n_features': n_features, 'shards': []}
+        if self.index['n_slots'] != self.n_slots or self.index['n_features'] != n_features:
+            raise ValueError(f"{directory} holds states of a different size")
+        self.columns = None
+        self.rows = 0
+
+    def _open_shard(self):
+        name = f"shard_{len(self.index['shards']):06d}"
+        path = os.path.join(self.directory, name)
+        os.makedirs(path, exist_ok=True)
+        self.columns = {col: open_memmap(os.path.join(path, col + '.npy'), mode='w+', dtype=dtype,
+                                         shape=(self.shard_size,) + shape)
+                        for col, (shape, dtype) in _columns(self.n_slots, self.n_features).items()}
+        self.index['shards'].append({'name': name, 'size': 0})
+        self.rows = 0
+
+    def append(self, state, action, reward, next_state, done):
+        """Same arguments as DQNAgent.remember"""
+        if self.columns is None:
+            self._open_shard()
+        c, i = self.columns, self.rows
+        c['states'][i], c['features'][i] = pack_states(state, self.n_slots)
+        c['next_states'][i], c['next_features'][i] = pack_states(next_state, self.n_slots)
+        c['actions'][i] = action
+        c['rewards'][i] = reward
+        c['dones'][i] = done
+        self.rows += 1
+        if self.rows == self.shard_size:
+            self.flush()
+            self.columns = None
+
+    def flush(self):
+        if self.columns is None:
+            return
+        for column in self.columns.values():
+            column.flush()
+        self.index['shards'][-1]['size'] = self.rows
+        path = os.path.join(self.directory, 'index.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self.index, f)
+        os.replace(path + '.tmp', path)
+
+    def close(self):
+        self.flush()
+        self.columns = None
+
+
+def _read_index(directory):
+    path = os.path.join(directory, 'index.json')
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+class TransitionDataset:
+    """Read-only view of a TransitionWriter directory; shards stay memory-mapped"""
+    def __init__(self, directory):
+        index = _read_index(directory)
+        if index is None:
+            raise FileNotFoundError(f"No transition dataset in {directory}")
+        self.n_slots = index['n_slots']
+        self.shards = []
+        for shard in index['shards']:
+            if shard['size'] == 0:
+                continue
+            path = os.path.join(directory, shard['name'])
+            columns = {col: np.load(os.path.join(path, col + '.npy'), mmap_mode='r')
+                       for col in _columns(self.n_slots, index['n_features'])}
+            self.shards.append((shard['size'], columns))
+        self.offsets = np.cumsum([0] + [size for size, _ in self.shards])
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def _gather(self, idx):
+        # Global row indices -> arrays; rows are read shard by shard in sorted order
+        idx = np.sort(idx)
+        shard_of = np.searchsorted(self.offsets, idx, side='right') - 1
+        parts = []
+        for k in np.unique(shard_of):
+            _, c = self.shards[k]
+            local = idx[shard_of == k] - self.offsets[k]
+            parts.append({col: c[col][local] for col in c})
+        c = {col: np.concatenate([p[col] for p in parts]) for col in parts[0]}
+        states = unpack_states(c['states'], c['features'], self.n_slots)
+        next_states = unpack_states(c['next_states'], c['next_features'], self.n_slots)
+        return states, c['actions'], c['rewards'], next_states, c['dones']
+
+    def sample(self, batch_size):
+        """Uniform random batch as (states, actions, rewards, next_states, dones) arrays"""
+        return self._gather(np.random.randint(0, len(self), size=batch_size))
+
+    def iter_batches(self, batch_size, shuffle=True):
+        """One pass over the dataset in batches, touching one window of rows at a time"""
+        order = np.random.permutation(len(self)) if shuffle else np.arange(len(self))
+        for start in range(0, len(self), batch_size):
+            yield self._gather(order[start:start + batch_size])
+
+
+def _slot_policy(policy, env):
+    """Adapt a baseline policy name or callable to slot = choose(free_slots)"""
+    if policy == 'random':
+        return random_policy
+    if policy == 'nearest':
+        return lambda free: nearest_policy(free, env.slot_distance)
+    if policy == 'balanced':
+        return lambda free: balanced_policy(free, env.lot, env.slot_distance)
+    return lambda free: policy(free, env.lot)
+
+
+def log_policy(writer, env, policy, episodes):
+    """Run `policy` in `env` and append every transition to `writer`.
+
+    `policy` is 'random', 'nearest', 'balanced', a callable (free_slots, lot)
+    returning a slot (e.g. a distilled student), or an agent with choose_action.
+    Returns the number of transitions written.
+    """
+    agent = policy if hasattr(policy, 'choose_action') else None
+    choose = None if agent else _slot_policy(policy, env)
+    written = 0
+    for _ in range(episodes):
+        state = env.reset()
+        while env.current_car is not None:
+            if agent:
+                available = env.get_available_actions()
+                if not available:
+                    break
+                action = agent.choose_action(state, available)
+            else:
+                slot = choose(env.lot.get_free_slots())
+                if slot is None:
+                    break
+                action = slot[0] * env.cols + slot[1]
+            next_state, reward, done, _ = env.step(action)
+            writer.append(state, action, reward, next_state, done)
+            written += 1
+            state = next_state
+            if done:
+                break
+    return written
+
+
+def prefill(agent, dataset, n=None):
+    """Fill agent.memory with up to `n` distinct random transitions (default: its capacity)"""
+    n = min(n or agent.memory_size, len(dataset))
+    added = 0
+    # A shuffled pass rather than sample(): no transition is added twice
+    for batch in dataset.iter_batches(4096, shuffle=True):
+        for t in zip(*(column[:n - added] for column in batch)):
+            agent.remember(*t)
+        added += min(len(batch[1]), n - added)
+        if added >= n:
+            break
+    return n
+
+
+def pretrain(agent, dataset, steps, batch_size=None, target_update=500):
+    """Fit agent.q_network on dataset batches (offline Q-learning); returns the mean loss"""
+    batch_size = batch_size or agent.batch_size
+    losses = []
+    for step in range(steps):
+        losses.append(agent.train_on_batch(*dataset.sample(batch_size)))
+        if (step + 1) % target_update == 0:
+            agent.update_target_network()
+    agent.update_target_network()
+    return float(np.mean(losses)) if losses else None
+
+
+if __name__ == '__main__':
+    from agent.environment import ParkingLotEnv
+    parser = argparse.ArgumentParser(description='Log policy transitions to a sharded dataset')
+    parser.add_argument('directory')
+    parser.add_argument('--policy', choices=['random', 'nearest', 'balanced'], default='nearest')
+    parser.add_argument('--episodes', type=int, default=10000)
+    parser.add_argument('--rows', type=int, default=5)
+    parser.add_argument('--cols', type=int, default=10)
+    parser.add_argument('--shard-size', type=int, default=1_000_000)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    env = ParkingLotEnv(rows=args.rows, cols=args.cols)
+    writer = TransitionWriter(args.directory, env.get_state_size(), args.shard_size)
+    n = log_policy(writer, env, args.policy, args.episodes)
+    writer.close()
+    print(f"Wrote {n} {args.policy} transitions to {args.directory} ({len(TransitionDataset(args.directory))} total)")
@@ -0,0 +1,212 @@
+# Distill a trained DQNAgent into a compact student policy for gate controllers
+#
+# Students score every slot from the occupancy grid alone (no network) and pick
+# the best free one. They plug in like the baseline policies:
+#     slot = student(free_slots, lot)
+# and like an agent in ParkingLotEnv loops:
+#     action = student.choose_action(state, env.get_available_actions())
+import random
+import pickle
+import argparse
+import numpy as np
+import torch
+
+
+def _grid_features(grids, rows, cols):
+    """Per-slot features for a batch of flat grids: shape (batch, rows*cols, n_features)"""
+    g = grids.reshape(-1, rows, cols).astype(np.float32)
+    b = g.shape[0]
+    row_load = np.repeat(g.sum(axis=2, keepdims=True), cols, axis=2) / cols
+    col_load = np.repeat(g.sum(axis=1, keepdims=True), rows, axis=1) / rows
+    padded = np.pad(g, ((0, 0), (0, 0), (1, 1)))
+    neighbours = (padded[:, :, :-2] + padded[:, :, 2:]) / 2
+    completes_row = (row_load * cols == cols - 1).astype(np.float32)
+    r = np.broadcast_to(np.arange(rows, dtype=np.float32)[None, :, None], g.shape)
+    c = np.broadcast_to(np.arange(cols, dtype=np.float32)[None, None, :], g.shape)
+    occupancy = np.broadcast_to(g.mean(axis=(1, 2))[:, None, None], g.shape)
+    feats = [np.ones_like(g), r, c, row_load, col_load, neighbours, completes_row, occupancy,
+             c * row_load, r * occupancy]
+    return np.stack(feats, axis=-1).reshape(b, rows * cols, len(feats))
+
+
+class _Student:
+    """Shared interface: subclasses implement scores(grids) -> (batch, n_slots)"""
+    def __init__(self, rows, cols):
+        self.rows = rows
+        self.cols = cols
+
+    def _best(self, grid):
+        grid = np.asarray(grid, dtype=np.float32).reshape(1, -1)
+        scores = self.scores(grid)[0]
+        scores[grid[0] > 0.5] = -np.inf
+        return int(scores.argmax())
+
+    def __call__(self, free_slots, lot):
+        if not free_slots:
+            return None
+        action = self._best(lot.grid)
+        return (action // self.cols, action % self.cols)
+
+    def choose_action(self, state, available_actions):
+        if len(available_actions) == 0:
+            return None
+        return self._best(np.asarray(state)[:self.rows * self.cols])
+
+    def save(self, filepath):
+        with open(filepath, 'wb') as f:
+            pickle.dump(self, f)
+
+
+class LinearScorerPolicy(_Student):
+    """Least-squares linear scorer over row/column/load features of each slot"""
+    def fit(self, grids, q_values):
+        x = _grid_features(grids, self.rows, self.cols)
+        free = grids < 0.5
+        # Only the ranking among free slots matters: centre Q per state
+        q = np.where(free, q_values, np.nan)
+        q = q - np.nanmean(q, axis=1, keepdims=True)
+        self.weights, *_ = np.linalg.lstsq(x[free], q[free], rcond=None)
+        return self
+
+    def scores(self, grids):
+        return _grid_features(grids, self.rows, self.cols) @ self.weights
+
+
+class LookupTablePolicy(_Student):
+    """Exact action per occupancy bitmask; practical up to about 20 slots"""
+    def fit_exact(self, agent, time_values=(0.0, 0.25, 0.5, 0.75), batch=4096):
+        """Query the teacher on every grid; the time feature is averaged out"""
+        n = self.rows * self.cols
+        masks = np.arange(2 ** n, dtype=np.int64)
+        self.table = np.full(2 ** n, -1, dtype=np.int16)
+        bits = 1 << np.arange(n, dtype=np.int64)
+        for start in range(0, 2 ** n, batch):
+            m = masks[start:start + batch]
+            grids = ((m[:, None] & bits) > 0).astype(np.float32)
+            q = np.zeros_like(grids)
+            for t in time_values:
+                q += _teacher_q(agent, _states(grids, t))
+            q[grids > 0.5] = -np.inf
+            full = grids.all(axis=1)
+            self.table[start:start + batch] = np.where(full, -1, q.argmax(axis=1))
+        return self
+
+    def _best(self, grid):
+        grid = np.asarray(grid).reshape(-1)
+        mask = int((grid > 0.5).astype(np.int64) @ (1 << np.arange(grid.size, dtype=np.int64)))
+        return int(self.table[mask])
+
+
+class DecisionTreePolicy(_Student):
+    """Decision tree over the grid predicting the teacher's slot (needs scikit-learn)"""
+    def fit(self, grids, q_values, max_depth=12):
+        from sklearn.tree import DecisionTreeClassifier
+        q = np.where(grids < 0.5, q_values, -np.inf)
+        self.tree = DecisionTreeClassifier(max_depth=max_depth).fit(grids, q.argmax(axis=1))
+        return self
+
+    def scores(self, grids):
+        scores = np.full((grids.shape[0], self.rows * self.cols), -1e9, dtype=np.float32)
+        proba = self.tree.predict_proba(grids)
+        scores[:, self.tree.classes_] = proba
+        return scores
+
+
+def _states(grids, time_normalized):
+    extra = np.stack([grids.mean(axis=1), np.ones(len(grids)), np.full(len(grids), time_normalized)], axis=1)
+    return np.concatenate([grids, extra], axis=1).astype(np.float32)
+
+
+def _teacher_q(agent, states):
+    with torch.no_grad():
+        return agent.q_network(torch.from_numpy(states)).numpy()
+
+
+def collect_teacher_data(agent, env, episodes=200, explore=0.1):
+    """Roll out the teacher (with a little exploration for coverage); return states and Q values"""
+    states = []
+    epsilon, agent.epsilon = agent.epsilon, explore
+    for _ in range(episodes):
+        state = env.reset()
+        while True:
+            available = env.get_available_actions()
+            if not available or env.current_car is None:
+                break
+            states.append(state)
+            state, _, done, _ = env.step(agent.choose_action(state, available))
+            if done:
+                break
+    agent.epsilon = epsilon
+    states = np.asarray(states, dtype=np.float32)
+    return states, _teacher_q(agent, states)
+
+
+def _rollout_reward(policy, env, episodes, seed):
+    total = 0.0
+    for ep in range(episodes):
+        random.seed(seed + ep)
+        state = env.reset()
+        while True:
+            available = env.get_available_actions()
+            if not available or env.current_car is None:
+                break
+            state, reward, done, _ = env.step(policy.choose_action(state, available))
+            total += reward
+            if done:
+                break
+    return total / episodes
+
+
+def evaluate_student(student, agent, env, states, q_values, episodes=50, seed=0):
+    """Agreement with the teacher on held-out states and the reward gap on identical episodes"""
+    n = env.rows * env.cols
+    grids = states[:, :n]
+    teacher = np.where(grids < 0.5, q_values, -np.inf).argmax(axis=1)
+    student_actions = np.array([student._best(g) for g in grids])
+    epsilon, agent.epsilon = agent.epsilon, 0.0
+    teacher_reward = _rollout_reward(agent, env, episodes, seed)
+    agent.epsilon = epsilon
+    student_reward = _rollout_reward(student, env, episodes, seed)
+    return {
+        'agreement': float((student_actions == teacher).mean()),
+        'teacher_reward': teacher_reward,
+        'student_reward': student_reward,
+        'reward_gap': teacher_reward - student_reward,
+    }
+
+
+def distill(agent, env, kind='linear', episodes=200):
+    """Fit a student of the given kind ('linear', 'table' or 'tree') and evaluate it"""
+    states, q_values = collect_teacher_data(agent, env, episodes)
+    split = int(len(states) * 0.8)
+    n = env.rows * env.cols
+    if kind == 'table':
+        student = LookupTablePolicy(env.rows, env.cols).fit_exact(agent)
+    elif kind == 'tree':
+        student = DecisionTreePolicy(env.rows, env.cols).fit(states[:split, :n], q_values[:split])
+    else:
+        student = LinearScorerPolicy(env.rows, env.cols).fit(states[:split, :n], q_values[:split])
+    report = evaluate_student(student, agent, env, states[split:], q_values[split:])
+    return student, report
+
+
+if __name__ == '__main__':
+    from agent.dqn import DQNAgent
+    from agent.environment import ParkingLotEnv
+    parser = argparse.ArgumentParser(description='Distill a trained DQN into a compact policy')
+    parser.add_argument('model', help='path to a DQNAgent .pth checkpoint')
+    parser.add_argument('--rows', type=int, default=3)
+    parser.add_argument('--cols', type=int, default=5)
+    parser.add_argument('--cars', type=int, default=15, help='cars per episode')
+    parser.add_argument('--kind', choices=['linear', 'table', 'tree'], default='linear')
+    parser.add_argument('--out', default='models/student_policy.pkl')
+    args = parser.parse_args()
+
+    env = ParkingLotEnv(rows=args.rows, cols=args.cols, max_cars_per_episode=args.cars)
+    agent = DQNAgent(env.get_state_size(), env.get_action_space_size())
+    agent.load(args.model)
+    student, report = distill(agent, env, args.kind)
+    student.save(args.out)
+    print(f"{args.kind} student saved to {args.out}")
+    print(f"Agreement: {report['agreement']:.1%}  Teacher reward: {report['teacher_reward']:.1f}  "
+          f"Student reward: {report['student_reward']:.1f}  Gap: {report['reward_gap']:.1f}")
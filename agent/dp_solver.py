@@ -0,0 +1,157 @@
+# Exact finite-horizon dynamic programming for small ParkingLotEnv layouts
+#
+# States are occupancy bitmasks (bit r*cols + c set when the slot is taken), so
+# a 3x5 lot has 2^15 = 32768 states and the whole value table fits in a NumPy
+# vector. Rewards are exactly ParkingLotEnv._calculate_reward.
+#
+# Departure approximation: the env gives each car a uniform duration around a
+# uniform mean; here every occupied slot (including the car just parked) frees
+# independently with probability p = 1 / mean duration per step. The
+# expectation over all 2^k departure subsets is then a product of per-bit
+# mixes, applied one bit (array axis) at a time.
+#
+#     python -m agent.dp_solver --rows 3 --cols 5 --cars 15
+import time
+import argparse
+import numpy as np
+
+
+def env_mean_duration(low=5, high=20):
+    """Mean parking duration of ParkingLotEnv cars (mean_duration=randint(5, 20) into Car.random_car)"""
+    means = np.arange(low, high + 1)
+    return float(np.mean((means // 2 + means * 3 // 2) / 2))
+
+
+def env_horizon(env):
+    """Cars a ParkingLotEnv episode actually places: the episode is done as soon as
+    the last car is spawned, so that car is never assigned"""
+    return env.max_cars_per_episode - 1
+
+
+class DPPolicy:
+    """Optimal policy table for the bitmask MDP of a rows x cols ParkingLotEnv.
+
+    After solve(horizon), `policy[h, mask]` is the best action with h cars left
+    in the episode (-1 when the lot is full) and `values[h, mask]` its expected
+    return. Solve with env_horizon(env) to match a ParkingLotEnv episode. Usable like a DQNAgent (choose_action) or a baseline policy
+    (called with free_slots and lot; uses the longest-horizon table).
+    """
+    def __init__(self, rows=3, cols=5, departure_prob=None, slot_distance=None):
+        if rows * cols > 20:
+            raise ValueError(f"{rows}x{cols} has 2^{rows * cols} states; the exact solver is for small lots")
+        self.rows = rows
+        self.cols = cols
+        self.n = rows * cols
+        self.departure_prob = 1 / env_mean_duration() if departure_prob is None else departure_prob
+        masks = np.arange(2 ** self.n, dtype=np.int64)
+        self.bits = ((masks[:, None] >> np.arange(self.n)) & 1).astype(bool)  # (states, slots)
+        self.rewards = self._rewards(slot_distance)
+        self.policy = None
+        self.values = None
+
+    def _rewards(self, slot_distance):
+        # rewards[s, a] for parking in free slot a from state s; -inf where a is taken
+        row_count = self.bits.reshape(-1, self.rows, self.cols).sum(axis=2)  # (states, rows)
+        slot_row = np.arange(self.n) // self.cols
+        slot_col = np.arange(self.n) % self.cols
+        if slot_distance:
+            distance = np.array([slot_distance[(r, c)] for r, c in zip(slot_row, slot_col)])
+        else:
+            distance = slot_col.astype(float)
+        after = row_count[:, slot_row] + 1  # row occupancy including the new car
+        rewards = 10 - distance * 0.5 + (self.cols - after) * 0.5 + 5 * (after == self.cols - 1)
+        return np.where(self.bits, -np.inf, rewards)
+
+    def _expect_departures(self, values):
+        # E[V(mask with each set bit cleared independently w.p. p)], one axis per slot
+        p = self.departure_prob
+        v = values.reshape((2,) * self.n)  # axis k is bit n-1-k (C order, high bit first)
+        for axis in range(self.n):
+            v = np.moveaxis(v, axis, 0)
+            v = np.stack([v[0], (1 - p) * v[1] + p * v[0]])
+            v = np.moveaxis(v, 0, axis)
+        return v.reshape(-1)
+
+    def solve(self, horizon=15):
+        """Backward induction over `horizon` arrivals; returns self"""
+        n_states = 2 ** self.n
+        full = n_states - 1
+        targets = np.arange(n_states)[:, None] | (1 << np.arange(self.n))  # mask after parking in a
+        self.values = np.zeros((horizon + 1, n_states))
+        self.policy = np.full((horizon + 1, n_states), -1, dtype=np.int8)
+        for h in range(1, horizon + 1):
+            after = self._expect_departures(self.values[h - 1])
+            q = self.rewards + after[targets]
+            self.policy[h] = q.argmax(axis=1)
+            self.values[h] = q.max(axis=1)
+            # No free slot ends the episode, as in the training and evaluation loops
+            self.policy[h, full] = -1
+            self.values[h, full] = 0.0
+        return self
+
+    def _mask(self, grid):
+        return int(np.dot(np.asarray(grid).reshape(-1)[:self.n] > 0.5, 1 << np.arange(self.n)))
+
+    def expected_return(self, horizon=None):
+        """Optimal expected episode reward from an empty lot"""
+        return float(self.values[len(self.values) - 1 if horizon is None else horizon, 0])
+
+    def choose_action(self, state, available_actions):
+        if len(available_actions) == 0:
+            return None
+        horizon = len(self.policy) - 1
+        elapsed = int(round(state[-1] * 100))  # time feature is (steps % 100) / 100
+        h = min(max(horizon - elapsed, 1), horizon)
+        return int(self.policy[h, self._mask(state)])
+
+    def __call__(self, free_slots, lot):
+        if not free_slots:
+            return None
+        action = int(self.policy[-1, self._mask(lot.grid)])
+        return (action // self.cols, action % self.cols)
+
+
+def episode_returns(policy, env, episodes=200):
+    """Reward of each of `episodes` episodes of an object with choose_action in `env`"""
+    returns = np.zeros(episodes)
+    for episode in range(episodes):
+        state = env.reset()
+        while env.current_car is not None:
+            available = env.get_available_actions()
+            if not available:
+                break
+            state, reward, done, _ = env.step(policy.choose_action(state, available))
+            returns[episode] += reward
+            if done:
+                break
+    return returns
+
+
+def evaluate(policy, env, episodes=200):
+    """Average episode reward of an object with choose_action in `env`"""
+    return float(episode_returns(policy, env, episodes).mean())
+
+
+if __name__ == '__main__':
+    from agent.environment import ParkingLotEnv
+    parser = argparse.ArgumentParser(description='Solve a small parking lot exactly by dynamic programming')
+    parser.add_argument('--rows', type=int, default=3)
+    parser.add_argument('--cols', type=int, default=5)
+    parser.add_argument('--cars', type=int, default=15, help='cars per episode (the horizon)')
+    parser.add_argument('--episodes', type=int, default=200, help='env episodes to evaluate the policy on')
+    args = parser.parse_args()
+
+    env = ParkingLotEnv(rows=args.rows, cols=args.cols, max_cars_per_episode=args.cars)
+    horizon = env_horizon(env)
+    start = time.perf_counter()
+    solver = DPPolicy(args.rows, args.cols).solve(horizon)
+    elapsed = time.perf_counter() - start
+    print(f"Solved {2 ** solver.n} states x {horizon} steps in {elapsed:.2f}s")
+    model = solver.expected_return()
+    print(f"Optimal expected reward (model): {model:.1f}")
+    returns = episode_returns(solver, env, args.episodes)
+    stderr = returns.std(ddof=1) / np.sqrt(len(returns)) if len(returns) > 1 else 0.0
+    print(f"Average reward in ParkingLotEnv: {returns.mean():.1f} +- {stderr:.1f}")
+    # The departure model is approximate, so allow 2% on top of the sampling error
+    if abs(returns.mean() - model) > 3 * stderr + 0.02 * abs(model):
+        parser.exit(1, f"model value {model:.1f} does not match the measured return {returns.mean():.1f}\n")
@@ -6,6 +6,7 @@ import torch.nn.functional as F
 import numpy as np
 import random
 from collections import deque
+from agent.observation import CompactReplayMemory
 
 class DQNNetwork(nn.Module):
     def __init__(self, state_size, action_size, hidden_size=128):
@@ -21,8 +22,96 @@ class DQNNetwork(nn.Module):
         x = F.relu(self.fc3(x))
         return self.fc4(x)
 
+class GridDQNNetwork(nn.Module):
+    """Fully convolutional Q-network over the occupancy grid.
+
+    Every slot is scored by the same convolutional head from its neighbourhood,
+    its absolute row/column position and a lot-wide context vector, so the
+    parameter count does not depend on the lot size and one set of weights
+    runs on any rows x cols layout (see set_layout).
+    """
+    def __init__(self, rows, cols, channels=32, n_features=3):
+        super(GridDQNNetwork, self).__init__()
+        self.n_features = n_features
+        in_channels = 1 + 2 + n_features  # occupancy, row/col position, broadcast features
+        self.conv1 = nn.Conv2d(in_channels, channels, 3, padding=1)
+        self.conv2 = nn.Conv2d(channels, channels, 3, padding=1)
+        self.conv3 = nn.Conv2d(2 * channels, channels, 1)  # local + pooled lot context
+        self.head = nn.Conv2d(channels, 1, 1)
+        self.set_layout(rows, cols)
+
+    def set_layout(self, rows, cols):
+        """Switch to a different lot size; the weights are unchanged"""
+        self.rows = rows
+        self.cols = cols
+        # Absolute positions (scaled) keep 'column 3' meaning the same distance on every lot
+        r = torch.arange(rows, dtype=torch.float32).view(rows, 1).expand(rows, cols) / 10
+        c = torch.arange(cols, dtype=torch.float32).view(1, cols).expand(rows, cols) / 10
+        device = self.conv1.weight.device
+        self.register_buffer('coords', torch.stack([r, c]).unsqueeze(0).to(device), persistent=False)
+
+    def forward(self, x):
+        b = x.shape[0]
+        n = self.rows * self.cols
+        grid = x[:, :n].view(b, 1, self.rows, self.cols)
+        features = x[:, n:n + self.n_features].view(b, -1, 1, 1).expand(b, self.n_features, self.rows, self.cols)
+        h = torch.cat([grid, self.coords.expand(b, -1, -1, -1), features], dim=1)
+        h = F.relu(self.conv1(h))
+        h = F.relu(self.conv2(h))
+        context = h.mean(dim=(2, 3), keepdim=True).expand_as(h)
+        h = F.relu(self.conv3(torch.cat([h, context], dim=1)))
+        return self.head(h).view(b, n)
+
+class IncrementalInference:
+    """Greedy Q-values for a DQNNetwork with fc1 updated by the changed inputs only.
+
+    The fc1 pre-activation of the last state is cached; the next state adds
+    W[:, i] * delta_i for the few inputs i that changed (a park, some departures
+    and the three features), so first-layer cost follows the number of changes
+    instead of the lot size. A full recompute every `refresh_every` updates
+    keeps rounding drift bounded. Weights are copied at sync(); call it (or
+    mark_stale) after the network is trained.
+    """
+    def __init__(self, network, refresh_every=1000):
+        if not isinstance(network, DQNNetwork):
+            raise ValueError("incremental inference needs the fully connected DQNNetwork")
+        self.network = network
+        self.refresh_every = refresh_every
+        self.sync()
+
+    def sync(self):
+        with torch.no_grad():
+            layers = [self.network.fc1, self.network.fc2, self.network.fc3, self.network.fc4]
+            self.weights = [l.weight.detach().cpu().numpy().astype(np.float64) for l in layers]
+            self.biases = [l.bias.detach().cpu().numpy().astype(np.float64) for l in layers]
+        self.w1_columns = np.ascontiguousarray(self.weights[0].T)  # row i = fc1 weights of input i
+        self.last_state = None
+        self.updates = 0
+        self.stale = False
+
+    def mark_stale(self):
+        self.stale = True
+
+    def q_values(self, state):
+        if self.stale:
+            self.sync()
+        state = np.asarray(state, dtype=np.float64)
+        if self.last_state is None or self.updates >= self.refresh_every:
+            self.pre = self.weights[0] @ state + self.biases[0]
+            self.updates = 0
+        else:
+            changed = np.flatnonzero(state != self.last_state)
+            self.pre += (state[changed] - self.last_state[changed]) @ self.w1_columns[changed]
+            self.updates += 1
+        self.last_state = state.copy()
+        h = np.maximum(self.pre, 0)
+        h = np.maximum(self.weights[1] @ h + self.biases[1], 0)
+        h = np.maximum(self.weights[2] @ h + self.biases[2], 0)
+        return self.weights[3] @ h + self.biases[3]
+
+
 class DQNAgent:
-    def __init__(self, state_size, action_size, lr=0.001, gamma=0.95, epsilon=1.0, epsilon_decay=0.995, epsilon_min=0.01, memory_size=10000, batch_size=32):
+    def __init__(self, state_size, action_size, lr=0.001, gamma=0.95, epsilon=1.0, epsilon_decay=0.995, epsilon_min=0.01, memory_size=10000, batch_size=32, compact_memory=False, layout=None):
         self.state_size = state_size
         self.action_size = action_size
         self.lr = lr
@@ -32,17 +121,46 @@ class DQNAgent:
         self.epsilon_min = epsilon_min
         self.batch_size = batch_size
         
-        # Neural networks
-        self.q_network = DQNNetwork(state_size, action_size)
-        self.target_network = DQNNetwork(state_size, action_size)
+        self.memory_size = memory_size
+        self.compact_memory = compact_memory
+        
+        # Neural networks; layout=(rows, cols) selects the size-independent grid network
+        if layout is not None:
+            self.q_network = GridDQNNetwork(*layout)
+            self.target_network = GridDQNNetwork(*layout)
+        else:
+            self.q_network = DQNNetwork(state_size, action_size)
+            self.target_network = DQNNetwork(state_size, action_size)
         self.optimizer = optim.Adam(self.q_network.parameters(), lr=lr)
         
-        # Experience replay
-        self.memory = deque(maxlen=memory_size)
+        self._reset_memory()
+        self.incremental = None
         
         # Copy weights to target network
         self.update_target_network()
         
+    def _reset_memory(self):
+        # Experience replay; the compact memory bit-packs grids and unpacks at batch time
+        if self.compact_memory:
+            self.memory = CompactReplayMemory(self.memory_size, self.state_size)
+        else:
+            self.memory = deque(maxlen=self.memory_size)
+
+    def set_layout(self, rows, cols):
+        """Move a grid-network agent to another lot size, keeping its weights"""
+        if not isinstance(self.q_network, GridDQNNetwork):
+            raise ValueError("set_layout needs an agent created with layout=(rows, cols)")
+        self.q_network.set_layout(rows, cols)
+        self.target_network.set_layout(rows, cols)
+        self.state_size = rows * cols + self.q_network.n_features
+        self.action_size = rows * cols
+        # Stored transitions have the old state size
+        self._reset_memory()
+
+    def enable_incremental(self, refresh_every=1000):
+        """Use IncrementalInference for greedy decisions (simulation and evaluation loops)"""
+        self.incremental = IncrementalInference(self.q_network, refresh_every)
+
     def update_target_network(self):
         """Copy weights from main network to target network"""
         self.target_network.load_state_dict(self.q_network.state_dict())
@@ -56,32 +174,43 @@ class DQNAgent:
         if len(available_actions) == 0:
             return None
             
-        if random.random() <= self.epsilon:
+        # No draw when greedy, so evaluation episodes replay the same arrivals for any policy
+        if self.epsilon > 0 and random.random() <= self.epsilon:
             return random.choice(available_actions)
         
-        # Convert state to tensor
+        if self.incremental is not None:
+            q_values = self.incremental.q_values(state)
+            return max(available_actions, key=q_values.__getitem__)
+        
+        # Convert state to tensor; no_grad so no autograd graph outlives the call
         state_tensor = torch.FloatTensor(state).unsqueeze(0)
-        q_values = self.q_network(state_tensor)
+        with torch.no_grad():
+            q_values = self.q_network(state_tensor)
         
         # Mask unavailable actions
-        masked_q_values = q_values.clone()
-        for i in range(self.action_size):
-            if i not in available_actions:
-                masked_q_values[0][i] = float('-inf')
+        mask = torch.full((self.action_size,), float('-inf'))
+        mask[torch.as_tensor(available_actions, dtype=torch.long)] = 0
+        masked_q_values = q_values[0] + mask
         
         return masked_q_values.argmax().item()
         
     def train(self):
-        """Train the network on a batch of experiences"""
+        """Train the network on a batch of experiences; returns the loss, or None if memory is too small"""
         if len(self.memory) < self.batch_size:
             return
             
-        batch = random.sample(self.memory, self.batch_size)
-        states = torch.FloatTensor([e[0] for e in batch])
-        actions = torch.LongTensor([e[1] for e in batch])
-        rewards = torch.FloatTensor([e[2] for e in batch])
-        next_states = torch.FloatTensor([e[3] for e in batch])
-        dones = torch.BoolTensor([e[4] for e in batch])
+        loss = self.train_on_batch(*self._sample_batch())
+        
+        # Decay epsilon
+        if self.epsilon > self.epsilon_min:
+            self.epsilon *= self.epsilon_decay
+            
+        return loss
+            
+    def train_on_batch(self, states, actions, rewards, next_states, dones):
+        """One gradient step on a batch of tensors or arrays; returns the loss"""
+        states, actions, rewards, next_states, dones = (
+            torch.as_tensor(a) for a in (states, actions, rewards, next_states, dones))
         
         # Current Q values
         current_q_values = self.q_network(states).gather(1, actions.unsqueeze(1))
@@ -97,11 +226,24 @@ class DQNAgent:
         self.optimizer.zero_grad()
         loss.backward()
         self.optimizer.step()
+        if self.incremental is not None:
+            self.incremental.mark_stale()
         
-        # Decay epsilon
-        if self.epsilon > self.epsilon_min:
-            self.epsilon *= self.epsilon_decay
+        return loss.item()
             
+    def _sample_batch(self):
+        """Sample a batch from replay memory as tensors"""
+        if isinstance(self.memory, CompactReplayMemory):
+            batch = self.memory.sample(self.batch_size)
+        else:
+            sampled = random.sample(self.memory, self.batch_size)
+            batch = (np.array([e[0] for e in sampled], dtype=np.float32),
+                     np.array([e[1] for e in sampled], dtype=np.int64),
+                     np.array([e[2] for e in sampled], dtype=np.float32),
+                     np.array([e[3] for e in sampled], dtype=np.float32),
+                     np.array([e[4] for e in sampled], dtype=np.bool_))
+        return tuple(torch.from_numpy(a) for a in batch)
+
     def save(self, filepath):
         """Save the model"""
         torch.save(self.q_network.state_dict(), filepath)
@@ -110,3 +252,37 @@ class DQNAgent:
         """Load the model"""
         self.q_network.load_state_dict(torch.load(filepath))
         self.update_target_network()
+        if self.incremental is not None:
+            self.incremental.sync()
+
+
+def network_spec(state_dict):
+    """Constructor arguments of the network a state dict belongs to, from its shapes"""
+    if 'fc1.weight' in state_dict:
+        return {'kind': 'dqn', 'state_size': int(state_dict['fc1.weight'].shape[1]),
+                'action_size': int(state_dict['fc4.weight'].shape[0]),
+                'hidden_size': int(state_dict['fc1.weight'].shape[0])}
+    if 'conv1.weight' in state_dict:
+        return {'kind': 'grid', 'channels': int(state_dict['conv1.weight'].shape[0]),
+                'n_features': int(state_dict['conv1.weight'].shape[1]) - 3}
+    raise ValueError('not a DQNNetwork or GridDQNNetwork state dict')
+
+
+def build_network(spec, rows, cols):
+    """Untrained network matching a network_spec() for a rows x cols lot"""
+    if spec['kind'] == 'dqn':
+        return DQNNetwork(spec['state_size'], spec['action_size'], spec['hidden_size'])
+    return GridDQNNetwork(rows, cols, spec['channels'], spec['n_features'])
+
+
+def greedy_agent(spec, rows, cols, network):
+    """Evaluation-only DQNAgent (epsilon 0, no optimizer) around a loaded `network`"""
+    n = rows * cols
+    with torch.device('meta'):  # its own networks are replaced below
+        if spec['kind'] == 'dqn':
+            agent = DQNAgent(spec['state_size'], spec['action_size'], epsilon=0.0, memory_size=1)
+        else:
+            agent = DQNAgent(n + spec['n_features'], n, epsilon=0.0, memory_size=1, layout=(rows, cols))
+    agent.q_network = agent.target_network = network
+    agent.optimizer = None
+    return agent
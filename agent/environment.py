@@ -1,45 +1,135 @@
 # Environment wrapper for parking lot RL training
 import numpy as np
 from sim.parking_lot import ParkingLot
-from sim.car import Car
+from sim.car import CarPool, CarTable
 from sim.metrics import Metrics
+from sim.road_network import RoadNetwork
+from agent.observation import ObservationBuilder
 import random
 
+
+class EnvSnapshot:
+    """State of a ParkingLotEnv as flat values, from ParkingLotEnv.snapshot().
+
+    `slot_leave` holds each slot's leave time (inf when free), which is all the
+    env needs to rebuild its lot, observation and car table. Arrays from the
+    arrival schedule are shared, not copied: the schedule replaces them
+    instead of writing into them.
+    """
+    __slots__ = ('slot_leave', 'time', 'cars_processed', 'current', 'metrics', 'arrivals', 'batch')
+
+    def __init__(self, slot_leave, time, cars_processed, current, metrics, arrivals, batch=()):
+        self.slot_leave = slot_leave
+        self.time = time
+        self.cars_processed = cars_processed
+        self.current = current  # (arrival time, parking duration) of the waiting car, or None
+        self.metrics = metrics  # (parked, failed, rewards, wait times)
+        self.arrivals = arrivals
+        self.batch = batch  # (arrival time, parking duration) of each car from next_batch
+
+
 class ParkingLotEnv:
-    def __init__(self, rows=5, cols=10, max_cars_per_episode=50):
+    def __init__(self, rows=5, cols=10, max_cars_per_episode=50, dtype=np.float32, road_distance=False,
+                 arrivals=None):
         self.rows = rows
         self.cols = cols
         self.max_cars_per_episode = max_cars_per_episode
+        # Driving distance per slot (in column widths) from the road graph; None keeps
+        # the column index as the distance proxy
+        self.slot_distance = RoadNetwork(rows, cols).distance_table() if road_distance else None
+        self.obs = ObservationBuilder(rows, cols, dtype)
+        # Optional sim.arrivals.ArrivalSchedule: time then jumps from arrival to
+        # arrival instead of advancing one unit per car, e.g.
+        # ArrivalSchedule(rate=1.0, mean_duration=12) for a Poisson version of the default
+        self.arrivals = arrivals
+        self.pool = CarPool()
         self.reset()
         
     def reset(self):
         """Reset the environment for a new episode"""
         self.lot = ParkingLot(self.rows, self.cols)
+        self.obs.reset()
         self.metrics = Metrics()
-        self.cars = []
+        self.cars = CarTable()
+        self.slot_leave = np.full(self.rows * self.cols, np.inf)  # leave time per slot, inf when free
         self.time = 0
+        if self.arrivals:
+            self.arrivals.restart()
+            self.time = self.arrivals.peek()
         self.cars_processed = 0
         self.current_car = None
+        self.batch = []  # cars collected by next_batch
         self._spawn_next_car()
         return self.get_state()
         
-    def get_state(self):
+    def get_state(self, copy=True):
         """Get current state representation"""
-        # Flatten parking lot grid
-        lot_state = np.array(self.lot.grid).flatten()
-        
-        # Add additional features
+        # Grid cells are maintained incrementally by _occupy/_free
         occupancy = self.lot.occupancy_percent() / 100.0
         cars_waiting = 1 if self.current_car else 0
         time_normalized = (self.time % 100) / 100.0  # Normalize time
-        
-        # Combine all features
-        state = np.concatenate([
-            lot_state,
-            [occupancy, cars_waiting, time_normalized]
-        ])
-        
-        return state
+        self.obs.set_features(occupancy, cars_waiting, time_normalized)
+        return self.obs.observe(copy)
+
+    def _occupy(self, row, col):
+        self.lot.occupy(row, col)
+        self.obs.set_slot(row * self.cols + col, 1)
+
+    def _free(self, row, col):
+        self.lot.free(row, col)
+        self.obs.set_slot(row * self.cols + col, 0)
+        self.slot_leave[row * self.cols + col] = np.inf
+
+    def _park(self, car, row, col):
+        self._occupy(row, col)
+        car.slot = (row, col)
+        leave_time = self.time + car.parking_duration
+        self.cars.add(car, leave_time)
+        self.slot_leave[row * self.cols + col] = leave_time
+
+    def snapshot(self):
+        """Copy of the episode state for restore(), without copying any objects"""
+        car = self.current_car
+        m = self.metrics
+        arrivals = None
+        if self.arrivals:
+            a = self.arrivals
+            arrivals = (a.times, a.lengths, a.cursor, a.end, a.next_time, a.rng.bit_generator.state)
+        return EnvSnapshot(self.slot_leave.copy(), self.time, self.cars_processed,
+                           (car.arrival_time, car.parking_duration) if car else None,
+                           (m.parked, m.failed, m.rewards, tuple(m.wait_times)), arrivals,
+                           tuple((c.arrival_time, c.parking_duration) for c in self.batch))
+
+    def restore(self, snapshot):
+        """Return to a state taken by snapshot(); cars are recycled through the pool"""
+        for car in self.cars.cars:
+            self.pool.release(car)
+        if self.current_car:
+            self.pool.release(self.current_car)
+        for car in self.batch:
+            self.pool.release(car)
+        self.lot = ParkingLot(self.rows, self.cols)
+        self.obs.reset()
+        self.cars = CarTable()
+        self.batch = [self.pool.acquire(*c) for c in snapshot.batch]
+        self.slot_leave = snapshot.slot_leave.copy()
+        self.time = snapshot.time
+        for index in np.flatnonzero(np.isfinite(self.slot_leave)):
+            row, col = divmod(int(index), self.cols)
+            self._occupy(row, col)
+            car = self.pool.acquire(self.time, float(self.slot_leave[index]) - self.time)
+            car.slot = (row, col)
+            self.cars.add(car, float(self.slot_leave[index]))
+        self.cars_processed = snapshot.cars_processed
+        self.current_car = self.pool.acquire(*snapshot.current) if snapshot.current else None
+        self.metrics = Metrics()
+        self.metrics.parked, self.metrics.failed, self.metrics.rewards, wait_times = snapshot.metrics
+        self.metrics.wait_times = list(wait_times)
+        if snapshot.arrivals:
+            a = self.arrivals
+            a.times, a.lengths, a.cursor, a.end, a.next_time, state = snapshot.arrivals
+            a.rng.bit_generator.state = state
+        return self.get_state()
         
     def get_action_space_size(self):
         """Get the number of possible actions (parking slots)"""
@@ -49,14 +139,27 @@ class ParkingLotEnv:
         """Get the size of the state vector"""
         return self.rows * self.cols + 3  # grid + additional features
         
+    def _new_car(self):
+        if self.arrivals is None:
+            return self.pool.random_car(self.time, mean_duration=random.randint(5, 20))
+        _, duration = self.arrivals.pop()
+        return self.pool.acquire(self.time, duration)
+
     def _spawn_next_car(self):
         """Spawn the next car"""
         if self.cars_processed < self.max_cars_per_episode:
-            self.current_car = Car.random_car(self.time, mean_duration=random.randint(5, 20))
+            self.current_car = self._new_car()
             self.cars_processed += 1
         else:
             self.current_car = None
-            
+
+    def _advance_time(self):
+        # One unit per car, or on to the next scheduled arrival
+        if self.arrivals and self.cars_processed < self.max_cars_per_episode:
+            self.time = max(self.time, self.arrivals.peek())
+        else:
+            self.time += 1
+
     def step(self, action):
         """Take an action in the environment"""
         if self.current_car is None:
@@ -72,12 +175,7 @@ class ParkingLotEnv:
         # Check if action is valid (slot is free)
         if self.lot.is_free(row, col):
             # Park the car
-            self.lot.occupy(row, col)
-            self.current_car.slot = (row, col)
-            self.cars.append({
-                'car': self.current_car,
-                'leave_time': self.time + self.current_car.parking_duration
-            })
+            self._park(self.current_car, row, col)
             
             # Calculate reward
             reward = self._calculate_reward(row, col)
@@ -87,9 +185,10 @@ class ParkingLotEnv:
             # Invalid action (slot occupied)
             reward = -10  # Heavy penalty for invalid action
             self.metrics.record_fail()
+            self.pool.release(self.current_car)
             
         # Update time and remove cars that should leave
-        self.time += 1
+        self._advance_time()
         self._update_cars()
         
         # Spawn next car
@@ -108,12 +207,57 @@ class ParkingLotEnv:
         
         return self.get_state(), reward, done, info
         
+    def next_batch(self, size):
+        """Collect a burst of up to `size` arrivals (the current car first) for step_batch.
+
+        Returns the parking durations of the waiting cars, e.g. for
+        sim.batch_assign.assign_batch.
+        """
+        self.batch = [self.current_car] if self.current_car else []
+        while len(self.batch) < size and self.cars_processed < self.max_cars_per_episode:
+            if self.arrivals:
+                self.time = max(self.time, self.arrivals.peek())
+            self.batch.append(self._new_car())
+            self.cars_processed += 1
+        self.current_car = None
+        if self.arrivals:
+            self._update_cars()  # departures while the burst gathered
+        return [car.parking_duration for car in self.batch]
+
+    def step_batch(self, actions):
+        """Park the cars from next_batch at `actions` (None turns a car away) in one time step"""
+        total_reward = 0
+        for car, action in zip(self.batch, actions):
+            row, col = (action // self.cols, action % self.cols) if action is not None else (0, 0)
+            if action is not None and self.lot.is_free(row, col):
+                self._park(car, row, col)
+                total_reward += self._calculate_reward(row, col)
+                self.metrics.record_park(0)
+            else:
+                # Turned away, or sent to a taken slot
+                total_reward += -10 if action is not None else 0
+                self.metrics.record_fail()
+                self.pool.release(car)
+        self.batch = []
+        self._advance_time()
+        self._update_cars()
+        self._spawn_next_car()
+        done = self.cars_processed >= self.max_cars_per_episode
+        info = {
+            'occupancy': self.lot.occupancy_percent(),
+            'parked': self.metrics.parked,
+            'failed': self.metrics.failed,
+            'total_reward': self.metrics.rewards
+        }
+        return self.get_state(), total_reward, done, info
+
     def _calculate_reward(self, row, col):
         """Calculate reward for parking a car at given position"""
         base_reward = 10  # Base reward for successful parking
         
         # Distance from entrance (prefer closer spots)
-        distance_penalty = col * 0.5
+        distance = self.slot_distance[(row, col)] if self.slot_distance else col
+        distance_penalty = distance * 0.5
         
         # Load balancing (prefer less crowded rows)
         row_occupancy = sum(1 for c in range(self.cols) if not self.lot.is_free(row, c))
@@ -128,16 +272,14 @@ class ParkingLotEnv:
         
     def _update_cars(self):
         """Update cars and remove those whose time is up"""
-        cars_to_remove = []
-        for car_data in self.cars:
-            if car_data['leave_time'] <= self.time:
+        table = self.cars
+        for i in range(len(table) - 1, -1, -1):
+            if table.leave_times[i] <= self.time:
+                car = table.remove_at(i)
                 # Free the parking slot
-                if car_data['car'].slot:
-                    self.lot.free(*car_data['car'].slot)
-                cars_to_remove.append(car_data)
-                
-        for car_data in cars_to_remove:
-            self.cars.remove(car_data)
+                if car.slot:
+                    self._free(*car.slot)
+                self.pool.release(car)
             
     def get_available_actions(self):
         """Get list of available actions (free parking slots)"""
@@ -0,0 +1,184 @@
+# Monte Carlo lookahead on top of ParkingLotEnv.snapshot()
+#
+# For each candidate slot the policy parks the current car there and plays
+# the rest of the episode forward `rollouts` times with a cheap rollout policy
+# (nearest free slot by default), then picks the slot with the best average
+# return. All rollouts of all candidates run together as one NumPy batch over
+# per-slot leave-time arrays, with the same sampled arrivals for every
+# candidate (common random numbers), so the comparison is not swamped by noise.
+# Rounds of rollouts repeat until the per-arrival latency budget is spent.
+#
+#     python -m agent.lookahead --budget-ms 10
+import time
+import random
+import argparse
+import numpy as np
+from agent.policies import nearest_policy
+from sim.arrivals import DURATIONS
+
+
+class RolloutPolicy:
+    """Lookahead slot choice for the car waiting in `env`.
+
+    Usable like a DQNAgent (choose_action) or a baseline policy (called with
+    free_slots and lot). Each decision takes at most about `budget_ms`
+    milliseconds, or `max_rollouts` rollouts per candidate; `width` limits the
+    candidates to the slots with the best immediate reward. Decision times
+    are kept in `latencies` (seconds).
+    """
+    def __init__(self, env, rollouts=32, horizon=20, width=8, gamma=1.0, budget_ms=10.0, max_rollouts=256,
+                 rollout_policy='nearest', seed=None):
+        if rollout_policy not in ('nearest', 'random'):
+            raise ValueError(f"unknown rollout policy {rollout_policy!r}")
+        self.env = env
+        self.rollouts = rollouts
+        self.horizon = horizon
+        self.width = width
+        self.gamma = gamma
+        self.budget = budget_ms / 1000
+        self.max_rollouts = max_rollouts
+        self.rollout_policy = rollout_policy
+        self.rng = np.random.default_rng(seed)
+        self.n = env.rows * env.cols
+        self.slot_row = np.arange(self.n) // env.cols
+        if env.slot_distance:
+            self.distance = np.array([env.slot_distance[divmod(i, env.cols)] for i in range(self.n)], dtype=float)
+        else:
+            self.distance = (np.arange(self.n) % env.cols).astype(float)
+        self.latencies = []
+
+    def _rewards(self, occupied, actions):
+        # ParkingLotEnv._calculate_reward for parking at `actions`, given occupancy before parking
+        rows = self.slot_row[actions]
+        after = occupied.reshape(len(actions), self.env.rows, self.env.cols).sum(axis=2)[np.arange(len(actions)), rows] + 1
+        cols = self.env.cols
+        return 10 - 0.5 * self.distance[actions] + 0.5 * (cols - after) + 5 * (after == cols - 1)
+
+    def _sample_arrivals(self, time_now, k, h):
+        # Gaps between arrivals and parking durations, (k, h) each, from the env's arrival model
+        arrivals = self.env.arrivals
+        if arrivals is None:
+            means = self.rng.integers(5, 21, (k, h))  # mean_duration=randint(5, 20) into random_car
+            return np.ones((k, h)), self.rng.integers(means // 2, means * 3 // 2 + 1).astype(float)
+        gaps = self.rng.exponential(1 / arrivals.rate_at(time_now), (k, h))
+        sample = DURATIONS[arrivals.durations] if isinstance(arrivals.durations, str) else arrivals.durations
+        return gaps, sample(self.rng, k * h, arrivals.mean_duration).reshape(k, h)
+
+    def _rollout(self, leave, time_now, gaps, durations):
+        # Play every row of `leave` (one lot each) forward; returns the discounted returns
+        b = len(leave)
+        rows = np.arange(b)
+        now = np.full(b, float(time_now))
+        total = np.zeros(b)
+        alive = np.ones(b, dtype=bool)
+        for t in range(gaps.shape[1]):
+            now += gaps[:, t]
+            leave[leave <= now[:, None]] = np.inf  # departures
+            free = np.isinf(leave)
+            alive &= free.any(axis=1)  # a full lot ends the episode, as in the evaluation loops
+            if self.rollout_policy == 'nearest':
+                actions = np.where(free, self.distance, np.inf).argmin(axis=1)
+            else:
+                actions = np.where(free, self.rng.random(leave.shape), -1.0).argmax(axis=1)
+            reward = self._rewards(~free, actions)
+            total += np.where(alive, self.gamma ** (t + 1) * reward, 0.0)
+            parked = rows[alive]
+            leave[parked, actions[alive]] = now[alive] + durations[alive, t]
+        return total
+
+    def evaluate(self, snapshot, candidates):
+        """Average return of parking the waiting car at each candidate action"""
+        env = self.env
+        duration = snapshot.current[1]
+        remaining = max(0, min(self.horizon, env.max_cars_per_episode - snapshot.cars_processed - 1))
+        occupied = np.isfinite(snapshot.slot_leave)
+        base = self._rewards(np.repeat(occupied[None], len(candidates), axis=0), candidates)
+        if remaining == 0:
+            return base
+        start = time.perf_counter()
+        totals = np.zeros(len(candidates))
+        done = 0
+        while True:
+            round_start = time.perf_counter()
+            leave = np.repeat(snapshot.slot_leave[None], len(candidates) * self.rollouts, axis=0)
+            leave[np.arange(len(leave)), np.repeat(candidates, self.rollouts)] = snapshot.time + duration
+            gaps, durations = self._sample_arrivals(snapshot.time, self.rollouts, remaining)
+            returns = self._rollout(leave, snapshot.time, np.tile(gaps, (len(candidates), 1)),
+                                    np.tile(durations, (len(candidates), 1)))
+            totals += returns.reshape(len(candidates), self.rollouts).sum(axis=1)
+            done += self.rollouts
+            now = time.perf_counter()
+            # Stop unless another round of the same cost still fits the budget
+            if done >= self.max_rollouts or now - start + (now - round_start) > self.budget:
+                break
+        return base + totals / done
+
+    def choose_action(self, state, available_actions):
+        if len(available_actions) == 0:
+            return None
+        start = time.perf_counter()
+        snapshot = self.env.snapshot()
+        actions = np.asarray(available_actions)
+        if len(actions) > self.width:
+            occupied = np.repeat(np.isfinite(snapshot.slot_leave)[None], len(actions), axis=0)
+            actions = actions[np.argsort(-self._rewards(occupied, actions), kind='stable')[:self.width]]
+        action = int(actions[int(np.argmax(self.evaluate(snapshot, actions)))])
+        self.latencies.append(time.perf_counter() - start)
+        return action
+
+    def __call__(self, free_slots, lot):
+        # `lot` is the env's own lot; the leave times come from the env snapshot
+        if not free_slots:
+            return None
+        action = self.choose_action(None, [r * self.env.cols + c for r, c in free_slots])
+        return divmod(action, self.env.cols)
+
+
+def compare(env, policy, episodes=50, seed=0):
+    """Average episode reward of nearest_policy and `policy` on the same arrivals"""
+    results = {}
+    for name in ('nearest', 'lookahead'):
+        total = 0.0
+        for episode in range(episodes):
+            random.seed(seed + episode)
+            if env.arrivals:
+                env.arrivals.rng = np.random.default_rng(seed + episode)
+            state = env.reset()
+            while env.current_car is not None:
+                available = env.get_available_actions()
+                if not available:
+                    break
+                if name == 'nearest':
+                    slot = nearest_policy(env.lot.get_free_slots(), env.slot_distance)
+                    action = slot[0] * env.cols + slot[1]
+                else:
+                    action = policy.choose_action(state, available)
+                state, reward, done, _ = env.step(action)
+                total += reward
+                if done:
+                    break
+        results[name] = total / episodes
+    return results
+
+
+if __name__ == '__main__':
+    from agent.environment import ParkingLotEnv
+    parser = argparse.ArgumentParser(description='Monte Carlo lookahead versus the nearest-slot baseline')
+    parser.add_argument('--rows', type=int, default=5)
+    parser.add_argument('--cols', type=int, default=10)
+    parser.add_argument('--cars', type=int, default=50, help='cars per episode')
+    parser.add_argument('--episodes', type=int, default=50)
+    parser.add_argument('--budget-ms', type=float, default=10.0, help='decision time per arriving car')
+    parser.add_argument('--rollouts', type=int, default=32, help='rollouts per candidate and round')
+    parser.add_argument('--horizon', type=int, default=20, help='cars simulated after the current one')
+    parser.add_argument('--width', type=int, default=8, help='candidate slots considered')
+    args = parser.parse_args()
+
+    env = ParkingLotEnv(rows=args.rows, cols=args.cols, max_cars_per_episode=args.cars)
+    policy = RolloutPolicy(env, args.rollouts, args.horizon, args.width, budget_ms=args.budget_ms, seed=0)
+    results = compare(env, policy, args.episodes)
+    latencies = np.array(policy.latencies) * 1000
+    print(f"Nearest:   {results['nearest']:.1f} average reward")
+    print(f"Lookahead: {results['lookahead']:.1f} average reward")
+    print(f"Decision time: median {np.median(latencies):.2f} ms, p99 {np.percentile(latencies, 99):.2f} ms "
+          f"(budget {args.budget_ms:.0f} ms)")
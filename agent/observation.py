@@ -0,0 +1,91 @@
+# Preallocated observation buffers and bit-packed replay storage
+import numpy as np
+
+N_FEATURES = 3  # occupancy, cars waiting, normalized time
+
+
+class ObservationBuilder:
+    """Keeps the state vector in one preallocated buffer updated slot by slot"""
+    def __init__(self, rows, cols, dtype=np.float32):
+        self.n_slots = rows * cols
+        self.buffer = np.zeros(self.n_slots + N_FEATURES, dtype=dtype)
+        self.grid = self.buffer[:self.n_slots]  # view, written by set_slot
+
+    def reset(self):
+        self.buffer.fill(0)
+
+    def set_slot(self, index, value):
+        self.grid[index] = value
+
+    def set_features(self, occupancy, cars_waiting, time_normalized):
+        f = self.buffer[self.n_slots:]
+        f[0] = occupancy
+        f[1] = cars_waiting
+        f[2] = time_normalized
+
+    def observe(self, copy=True):
+        """Return the state; copy=False hands out the live buffer (valid until the next step)"""
+        return self.buffer.copy() if copy else self.buffer
+
+
+def pack_states(states, n_slots):
+    """Split states of shape (..., n_slots + 3) into packed grid bits and float32 features"""
+    states = np.asarray(states)
+    bits = np.packbits(states[..., :n_slots] > 0.5, axis=-1)
+    return bits, states[..., n_slots:].astype(np.float32)
+
+
+def unpack_states(bits, features, n_slots, out=None):
+    """Inverse of pack_states, writing float32 states into `out` when given"""
+    if out is None:
+        out = np.empty(bits.shape[:-1] + (n_slots + features.shape[-1],), dtype=np.float32)
+    out[..., :n_slots] = np.unpackbits(bits, axis=-1, count=n_slots)
+    out[..., n_slots:] = features
+    return out
+
+
+class CompactReplayMemory:
+    """Fixed-size ring of transitions with bit-packed grids.
+
+    Drop-in for the deque in DQNAgent: append((state, action, reward,
+    next_state, done)) and len(). A 5x10 lot takes 38 bytes of state per
+    transition instead of 848 for two float64 vectors.
+    """
+    def __init__(self, capacity, state_size, n_features=N_FEATURES):
+        self.capacity = capacity
+        self.n_slots = state_size - n_features
+        n_bytes = (self.n_slots + 7) // 8
+        self.states = np.zeros((capacity, n_bytes), dtype=np.uint8)
+        self.next_states = np.zeros((capacity, n_bytes), dtype=np.uint8)
+        self.features = np.zeros((capacity, n_features), dtype=np.float32)
+        self.next_features = np.zeros((capacity, n_features), dtype=np.float32)
+        self.actions = np.zeros(capacity, dtype=np.int64)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.dones = np.zeros(capacity, dtype=np.bool_)
+        self.pos = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def append(self, transition):
+        state, action, reward, next_state, done = transition
+        i = self.pos
+        self.states[i], self.features[i] = pack_states(state, self.n_slots)
+        self.next_states[i], self.next_features[i] = pack_states(next_state, self.n_slots)
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.dones[i] = done
+        self.pos = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def sample(self, batch_size):
+        """Return (states, actions, rewards, next_states, dones) arrays, unpacked to float32"""
+        idx = np.random.randint(0, self.size, size=batch_size)
+        states = unpack_states(self.states[idx], self.features[idx], self.n_slots)
+        next_states = unpack_states(self.next_states[idx], self.next_features[idx], self.n_slots)
+        return states, self.actions[idx], self.rewards[idx], next_states, self.dones[idx]
+
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.states, self.next_states, self.features,
+                                      self.next_features, self.actions, self.rewards, self.dones))
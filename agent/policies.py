@@ -4,11 +4,15 @@ import random
 def random_policy(free_slots):
     return random.choice(free_slots) if free_slots else None
 
-def nearest_policy(free_slots):
-    # Assume nearest is the slot with lowest column (closest to entry)
-    return min(free_slots, key=lambda x: x[1]) if free_slots else None
+def nearest_policy(free_slots, distances=None):
+    # Without a distance table (RoadNetwork.distance_table), nearest is the lowest column
+    if not free_slots:
+        return None
+    if distances is not None:
+        return min(free_slots, key=distances.__getitem__)
+    return min(free_slots, key=lambda x: x[1])
 
-def balanced_policy(free_slots, lot):
+def balanced_policy(free_slots, lot, distances=None):
     """Try to balance load across rows"""
     if not free_slots:
         return None
@@ -24,6 +28,6 @@ def balanced_policy(free_slots, lot):
     # Choose slot in that row if available
     row_slots = [slot for slot in free_slots if slot[0] == min_row]
     if row_slots:
-        return min(row_slots, key=lambda x: x[1])  # Nearest in that row
+        return nearest_policy(row_slots, distances)  # Nearest in that row
     
-    return nearest_policy(free_slots)  # Fallback
+    return nearest_policy(free_slots, distances)  # Fallback
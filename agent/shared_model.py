@@ -0,0 +1,281 @@
+# Publish network weights and lot-layout tables once; worker processes map
+# them read-only instead of each loading a checkpoint and rebuilding the layout
+#
+#     path = publish('models/dqn_parking_final.pth', rows=5, cols=10)   # parent
+#     model = attach(path)                                              # each worker
+#     agent, roads = model.agent(), model.roads()
+#
+# The file is a small JSON header followed by 64-byte aligned arrays. It goes
+# to /dev/shm when available (shared memory on Linux) and is opened with
+# np.memmap, so every worker's tensors point into the same page-cache pages.
+#
+#     python -m agent.shared_model models/dqn_parking_final.pth --workers 32
+import os
+import json
+import time
+import struct
+import tempfile
+import argparse
+import numpy as np
+import torch
+from agent.dqn import network_spec, build_network, greedy_agent
+from sim.layout import get_slot_center
+from sim.road_network import RoadNetwork
+
+MAGIC = b'PKSHARE1'
+ALIGN = 64
+
+
+def default_path(name):
+    """Location for a published file: shared memory if the system has it, else the temp dir"""
+    directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(directory, f"parkingsim-{name}.bin")
+
+
+def _paths(paths, slots):
+    # Waypoint lists as CSR: points of slot i are points[offsets[i]:offsets[i + 1]]
+    lengths = [len(paths[slot]) for slot in slots]
+    offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+    points = np.array([p for slot in slots for p in paths[slot]], dtype=np.float64).reshape(-1, 2)
+    return offsets, points
+
+
+def layout_tables(rows, cols, roads=None):
+    """Slot centers, entry/exit paths and distances of a rows x cols lot as flat arrays"""
+    roads = roads or RoadNetwork(rows, cols)
+    slots = [(r, c) for r in range(rows) for c in range(cols)]
+    table = roads.distance_table()
+    entry_offsets, entry_points = _paths(roads.entry_paths, slots)
+    exit_offsets, exit_points = _paths(roads.exit_paths, slots)
+    return {
+        'slot_centers': np.array([get_slot_center(r, c) for r, c in slots], dtype=np.float64),
+        'entry_distance': np.array([roads.entry_distance[s] for s in slots], dtype=np.float64),
+        'exit_distance': np.array([roads.exit_distance[s] for s in slots], dtype=np.float64),
+        'distance_table': np.array([table[s] for s in slots], dtype=np.float64),
+        'entry_offsets': entry_offsets, 'entry_points': entry_points,
+        'exit_offsets': exit_offsets, 'exit_points': exit_points,
+    }
+
+
+def publish(model, rows, cols, path=None, roads=None):
+    """Write weights and layout tables for attach(); returns the file path.
+
+    `model` is a checkpoint path (as written by DQNAgent.save), a state dict
+    or a network. The file is written next to its final name and renamed, so
+    workers never see a partial one.
+    """
+    if isinstance(model, str):
+        name = os.path.splitext(os.path.basename(model))[0]
+        state_dict = torch.load(model, map_location='cpu')
+    else:
+        name = 'model'
+        state_dict = model.state_dict() if isinstance(model, torch.nn.Module) else model
+    spec = network_spec(state_dict)
+    if spec['kind'] == 'dqn' and spec['action_size'] != rows * cols:
+        raise ValueError(f"network has {spec['action_size']} actions, a {rows}x{cols} lot has {rows * cols} slots")
+    path = path or default_path(f"{name}-{rows}x{cols}")
+    arrays = {f"weights/{k}": v.detach().cpu().numpy() for k, v in state_dict.items()}
+    arrays.update({f"layout/{k}": v for k, v in layout_tables(rows, cols, roads).items()})
+
+    entries, offset = {}, 0
+    for key, array in arrays.items():
+        entries[key] = [offset, array.dtype.str, list(array.shape)]
+        offset += -(-array.nbytes // ALIGN) * ALIGN
+    header = json.dumps({'rows': rows, 'cols': cols, 'network': spec,
+                         'arrays': entries}).encode()
+    start = -(-(len(MAGIC) + 8 + len(header)) // ALIGN) * ALIGN
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC + struct.pack('<Q', len(header)) + header)
+        for key, array in arrays.items():
+            f.seek(start + entries[key][0])
+            f.write(np.ascontiguousarray(array).tobytes())
+        f.truncate(start + offset)
+    os.replace(tmp, path)
+    return path
+
+
+class SharedModel:
+    """Read-only mapping of a file written by publish().
+
+    `arrays` maps names ('weights/fc1.weight', 'layout/slot_centers', ...) to
+    NumPy views of the file; nothing is copied until written. The mapping is
+    copy-on-write, so a stray in-place update stays private to its process.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a published model")
+            (length,) = struct.unpack('<Q', f.read(8))
+            header = json.loads(f.read(length))
+        start = -(-(len(MAGIC) + 8 + length) // ALIGN) * ALIGN
+        self.rows = header['rows']
+        self.cols = header['cols']
+        self.spec = header['network']
+        self.buffer = np.memmap(path, dtype=np.uint8, mode='c')
+        self.arrays = {}
+        for key, (offset, dtype, shape) in header['arrays'].items():
+            dtype = np.dtype(dtype)
+            count = int(np.prod(shape, dtype=np.int64))
+            begin = start + offset
+            self.arrays[key] = self.buffer[begin:begin + count * dtype.itemsize].view(dtype).reshape(shape)
+        self._network = None
+
+    def state_dict(self):
+        """Weights as CPU tensors sharing the mapped memory"""
+        return {key[len('weights/'):]: torch.from_numpy(array)
+                for key, array in self.arrays.items() if key.startswith('weights/')}
+
+    def network(self):
+        """The Q-network in eval mode, its parameters views of the mapping (built once per process)"""
+        if self._network is None:
+            # Built on the meta device: no weights are allocated just to be replaced
+            with torch.device('meta'):
+                network = build_network(self.spec, self.rows, self.cols)
+            network.load_state_dict(self.state_dict(), assign=True)
+            if self.spec['kind'] == 'grid':
+                network.set_layout(self.rows, self.cols)  # position buffer on the real device
+            network.requires_grad_(False)
+            self._network = network.eval()
+        return self._network
+
+    def agent(self):
+        """Greedy DQNAgent whose online and target networks are the shared network"""
+        return greedy_agent(self.spec, self.rows, self.cols, self.network())
+
+    def roads(self):
+        return SharedRoads(self)
+
+    def distance_table(self):
+        """Same as RoadNetwork.distance_table() for the published lot"""
+        table = self.arrays['layout/distance_table']
+        return {(i // self.cols, i % self.cols): float(d) for i, d in enumerate(table)}
+
+
+class SharedRoads:
+    """The lookups of RoadNetwork that the simulation uses, answered from a SharedModel.
+
+    Paths are turned into waypoint lists on first use per slot and then
+    cached, like RoadNetwork's (shared lists, do not modify).
+    """
+    def __init__(self, model):
+        self.rows = model.rows
+        self.cols = model.cols
+        self.arrays = model.arrays
+        self.model = model
+        self._entry, self._exit = {}, {}
+
+    def _path(self, cache, kind, slot):
+        path = cache.get(slot)
+        if path is None:
+            i = slot[0] * self.cols + slot[1]
+            offsets = self.arrays[f"layout/{kind}_offsets"]
+            points = self.arrays[f"layout/{kind}_points"][offsets[i]:offsets[i + 1]]
+            path = cache[slot] = [(float(x), float(y)) for x, y in points]
+        return path
+
+    def entry_path(self, slot):
+        return self._path(self._entry, 'entry', slot)
+
+    def exit_path(self, slot):
+        return self._path(self._exit, 'exit', slot)
+
+    def distance(self, slot):
+        return float(self.arrays['layout/entry_distance'][slot[0] * self.cols + slot[1]])
+
+    def distance_table(self):
+        return self.model.distance_table()
+
+
+_attached = {}
+
+
+def attach(path):
+    """SharedModel for `path`, mapped once per process"""
+    model = _attached.get(path)
+    if model is None:
+        model = _attached[path] = SharedModel(path)
+    return model
+
+
+def _pss_bytes():
+    # Proportional set size: shared pages are split between the processes mapping them
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                if line.startswith('Pss:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _bench_worker(source, shared, rows, cols, episodes, results):
+    from agent.dqn import DQNAgent
+    from agent.environment import ParkingLotEnv
+    from agent.async_eval import evaluate_agent
+    torch.set_num_threads(1)
+    DQNAgent(4, 1)  # torch's one-time lazy initialisation is paid by both variants alike
+    before = _pss_bytes()
+    start = time.process_time()  # CPU time, so workers sharing cores don't inflate each other's numbers
+    if shared:
+        model = attach(source)
+        agent, roads = model.agent(), model.roads()
+    else:
+        state_dict = torch.load(source, map_location='cpu')
+        spec = network_spec(state_dict)
+        network = build_network(spec, rows, cols)
+        network.load_state_dict(state_dict)
+        agent = greedy_agent(spec, rows, cols, network.eval())
+        roads = RoadNetwork(rows, cols)
+    loaded = time.process_time() - start
+    with torch.no_grad():
+        agent.q_network(torch.zeros(1, agent.state_size))  # touch every weight page
+    after = _pss_bytes()
+    reward = evaluate_agent(agent, ParkingLotEnv(rows, cols), episodes)['avg_reward']
+    results.put((loaded, after - before if before is not None else None, reward))
+
+
+def benchmark(checkpoint, rows, cols, workers=8, episodes=2):
+    """Load CPU time and memory added per worker: private copies versus one shared mapping"""
+    import multiprocessing as mp
+    ctx = mp.get_context('spawn')
+    path = publish(checkpoint, rows, cols)
+    report = {'file_mib': os.path.getsize(path) / 2**20}
+    try:
+        for name, source, shared in (('private', checkpoint, False), ('shared', path, True)):
+            results = ctx.Queue()
+            procs = [ctx.Process(target=_bench_worker, args=(source, shared, rows, cols, episodes, results))
+                     for _ in range(workers)]
+            for p in procs:
+                p.start()
+            done = [results.get() for _ in procs]
+            for p in procs:
+                p.join()
+            growth = [d[1] for d in done if d[1] is not None]
+            report[name] = {'load_seconds': float(np.mean([d[0] for d in done])),
+                            'added_mib': float(np.mean(growth)) / 2**20 if growth else None,
+                            'avg_reward': float(np.mean([d[2] for d in done]))}
+    finally:
+        os.remove(path)
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Publish a checkpoint for zero-copy worker attach')
+    parser.add_argument('checkpoint', help='.pth file from DQNAgent.save')
+    parser.add_argument('--rows', type=int, default=5)
+    parser.add_argument('--cols', type=int, default=10)
+    parser.add_argument('--out', help='published file (default: under /dev/shm)')
+    parser.add_argument('--workers', type=int, help='instead of publishing, compare N private and shared workers')
+    args = parser.parse_args()
+    if args.workers:
+        report = benchmark(args.checkpoint, args.rows, args.cols, args.workers)
+        print(f"Published file: {report.pop('file_mib'):.2f} MiB")
+        for name, r in report.items():
+            added = f"{r['added_mib']:.2f} MiB" if r['added_mib'] is not None else 'n/a'
+            print(f"{name:>8}: load {r['load_seconds'] * 1000:.1f} ms CPU, {added} PSS added per worker, "
+                  f"reward {r['avg_reward']:.1f}")
+    else:
+        print(publish(args.checkpoint, args.rows, args.cols, args.out))
@@ -87,6 +87,7 @@ def compare_policies():
         dqn_agent = DQNAgent(env.get_state_size(), env.get_action_space_size())
         dqn_agent.load('models/dqn_quick_demo.pth')
         dqn_agent.epsilon = 0  # No exploration during evaluation
+        dqn_agent.enable_incremental()  # fc1 updated from changed cells only
         policies['DQN'] = lambda env, state: dqn_agent.choose_action(state, env.get_available_actions())
     
     results = {}
@@ -0,0 +1,194 @@
+# Pregenerated arrival schedules: arrival times and parking durations for a
+# whole horizon drawn in one vectorized pass, then consumed from a cursor
+#
+#     schedule = ArrivalSchedule(rate=rush_hour(), durations='bimodal')
+#     for duration in schedule.pop_due(now):    # once per tick
+#         spawn(duration)
+#
+#     python -m sim.arrivals --profile rush --hours 24    # hourly arrival counts
+import time
+import argparse
+import numpy as np
+
+DAY = 24 * 3600.0
+
+
+def rush_hour(base_rate=1/8, peak=3.0, night=0.2):
+    """Piecewise-constant daily rate profile as [(seconds into the day, arrivals/s), ...]"""
+    hour = 3600.0
+    return [(0.0, night * base_rate), (6 * hour, base_rate), (7 * hour, peak * base_rate),
+            (9.5 * hour, base_rate), (12 * hour, 1.5 * base_rate), (14 * hour, base_rate),
+            (16.5 * hour, peak * base_rate), (19 * hour, base_rate), (22 * hour, night * base_rate)]
+
+
+PROFILES = {'flat': lambda base_rate=1/8: base_rate, 'rush': rush_hour}
+
+
+def _uniform(rng, n, mean):
+    # Same range as Car.random_car
+    mean = int(mean)
+    return rng.integers(mean // 2, mean * 3 // 2 + 1, n).astype(np.float64)
+
+
+def _exponential(rng, n, mean):
+    return np.maximum(rng.exponential(mean, n), 1.0)
+
+
+def _lognormal(rng, n, mean, sigma=0.75):
+    return np.maximum(rng.lognormal(np.log(mean) - sigma ** 2 / 2, sigma, n), 1.0)
+
+
+def _bimodal(rng, n, mean):
+    # 70% short errands, 30% long stays; the mixture keeps the overall mean
+    long_stay = rng.random(n) < 0.3
+    short = rng.exponential(0.4 * mean, n)
+    long = rng.gamma(4.0, 2.4 * mean / 4.0, n)
+    return np.maximum(np.where(long_stay, long, short), 1.0)
+
+
+DURATIONS = {'uniform': _uniform, 'exponential': _exponential, 'lognormal': _lognormal, 'bimodal': _bimodal}
+
+
+def _piecewise_times(start, end, profile, period, phase, rng):
+    # Each constant-rate segment gets a Poisson count and uniform times within it
+    offsets = np.array([o for o, _ in profile], dtype=np.float64)
+    rates = np.array([r for _, r in profile], dtype=np.float64)
+    ends = np.append(offsets[1:], period)
+    periods = np.arange(np.floor((start + phase) / period), np.ceil((end + phase) / period))
+    base = periods[:, None] * period - phase
+    seg_start = np.clip((base + offsets).ravel(), start, end)
+    seg_len = np.clip((base + ends).ravel(), start, end) - seg_start
+    counts = rng.poisson(np.tile(rates, len(periods)) * seg_len)
+    seg = np.repeat(np.arange(len(seg_start)), counts)
+    return np.sort(seg_start[seg] + rng.random(len(seg)) * seg_len[seg])
+
+
+def _thinned_times(start, end, rate, phase, rng, max_rate=None):
+    # Lewis-Shedler thinning of a homogeneous process at the peak rate
+    if max_rate is None:
+        max_rate = 1.1 * float(np.max(rate(np.linspace(start, end, 1025) + phase)))
+    candidates = np.sort(start + rng.random(rng.poisson(max_rate * (end - start))) * (end - start))
+    keep = rng.random(len(candidates)) * max_rate < rate(candidates + phase)
+    return candidates[keep]
+
+
+def generate_arrivals(start, end, rate=1/8, durations='uniform', mean_duration=10, rng=None,
+                      period=DAY, phase=0.0, max_rate=None):
+    """Arrival times in [start, end) and their parking durations, as two arrays.
+
+    `rate` is arrivals per second: a number, a piecewise-constant profile
+    [(offset, rate), ...] repeating every `period` (see rush_hour), or a
+    function of an array of times (sampled by thinning below `max_rate`).
+    `phase` is the time into the period at t = 0. `durations` names an entry
+    of DURATIONS or is a function (rng, n, mean_duration) -> array.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    if callable(rate):
+        times = _thinned_times(start, end, rate, phase, rng, max_rate)
+    else:
+        profile = [(0.0, rate)] if np.isscalar(rate) else rate
+        times = _piecewise_times(start, end, profile, period, phase, rng)
+    sample = DURATIONS[durations] if isinstance(durations, str) else durations
+    return times, sample(rng, len(times), mean_duration)
+
+
+class ArrivalSchedule:
+    """Endless arrival stream generated `chunk` seconds at a time.
+
+    pop_due(t) returns the durations of the cars arriving up to time t; when
+    none are due it costs one comparison. pop() takes arrivals one at a time
+    for event-driven callers. Arguments are as for generate_arrivals.
+    """
+    def __init__(self, rate=1/8, durations='uniform', mean_duration=10, chunk=3600.0, seed=None,
+                 period=DAY, phase=0.0, max_rate=None):
+        if not callable(rate) and max(r for _, r in ([(0.0, rate)] if np.isscalar(rate) else rate)) <= 0:
+            raise ValueError('arrival rate must be positive somewhere')
+        self.rate = rate
+        self.durations = durations
+        self.mean_duration = mean_duration
+        self.chunk = chunk
+        self.period = period
+        self.phase = phase
+        self.max_rate = max_rate
+        self.rng = np.random.default_rng(seed)
+        self.restart()
+
+    def rate_at(self, t):
+        """Arrivals per second at time t"""
+        if callable(self.rate):
+            return float(self.rate(np.array([t + self.phase]))[0])
+        if np.isscalar(self.rate):
+            return float(self.rate)
+        offsets = [o for o, _ in self.rate]
+        return float(self.rate[int(np.searchsorted(offsets, (t + self.phase) % self.period, 'right')) - 1][1])
+
+    def restart(self, start=0.0):
+        """Forget the generated arrivals and continue with fresh draws from `start`"""
+        self.end = start
+        self.times = np.empty(0)
+        self.lengths = np.empty(0)
+        self.cursor = 0
+        self.next_time = float('-inf')  # forces _extend on the first call
+
+    def _extend(self):
+        start, self.end = self.end, self.end + self.chunk
+        self.times, self.lengths = generate_arrivals(start, self.end, self.rate, self.durations,
+                                                     self.mean_duration, self.rng, self.period,
+                                                     self.phase, self.max_rate)
+        self.cursor = 0
+        self._advance(0)
+
+    def _advance(self, cursor):
+        self.cursor = cursor
+        # Past the last arrival nothing else can come before the chunk ends
+        self.next_time = float(self.times[cursor]) if cursor < len(self.times) else self.end
+
+    def peek(self):
+        """Time of the next arrival"""
+        while self.cursor >= len(self.times):
+            self._extend()
+        return self.next_time
+
+    def pop(self):
+        """(arrival time, parking duration) of the next arrival"""
+        t = self.peek()
+        duration = float(self.lengths[self.cursor])
+        self._advance(self.cursor + 1)
+        return t, duration
+
+    def pop_due(self, t):
+        """Parking durations of all arrivals at or before `t`, in order"""
+        if self.next_time > t:
+            return []
+        due = []
+        while True:
+            if self.cursor >= len(self.times):
+                if self.end > t:
+                    return due
+                self._extend()
+                continue
+            j = self.cursor + int(np.searchsorted(self.times[self.cursor:], t, side='right'))
+            due.extend(self.lengths[self.cursor:j].tolist())
+            self._advance(j)
+            if j < len(self.times):
+                return due
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate an arrival schedule and show hourly counts')
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='rush')
+    parser.add_argument('--rate', type=float, default=1/8, help='base arrivals per second')
+    parser.add_argument('--durations', choices=sorted(DURATIONS), default='uniform')
+    parser.add_argument('--mean-duration', type=float, default=10)
+    parser.add_argument('--hours', type=float, default=24)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+    start = time.perf_counter()
+    times, durations = generate_arrivals(0.0, args.hours * 3600, PROFILES[args.profile](args.rate),
+                                         args.durations, args.mean_duration, rng)
+    elapsed = time.perf_counter() - start
+    print(f"{len(times):,} arrivals in {elapsed * 1000:.1f} ms, mean duration {durations.mean():.1f}s")
+    counts = np.bincount((times // 3600).astype(np.int64), minlength=int(np.ceil(args.hours)))
+    for hour, count in enumerate(counts):
+        print(f"{hour:>3}h {count:>6} {'#' * int(60 * count / max(1, counts.max()))}")
@@ -0,0 +1,106 @@
+# Zoom/pan camera over the lot, with the visible slot range computed arithmetically
+import pygame
+from sim.layout import SLOT_WIDTH, SLOT_HEIGHT, LANE_WIDTH, ENTRY_ROAD_WIDTH
+
+COLUMN_PITCH = SLOT_WIDTH + 10
+ROW_PITCH = SLOT_HEIGHT + LANE_WIDTH
+LOD_ZOOM = 0.45  # below this, slots are drawn as colored cells without cars or text
+
+
+def world_size(rows, cols):
+    """Pixel size of a rows x cols lot at zoom 1"""
+    return ENTRY_ROAD_WIDTH + cols * COLUMN_PITCH + 40, 60 + rows * ROW_PITCH + 40
+
+
+class Camera:
+    """Maps world (layout) pixels to a view of `width` x `height` screen pixels.
+
+    (x, y) is the world point at the top-left corner of the view. The mouse
+    wheel zooms around the cursor, dragging or the arrow keys pan, and Home
+    fits the whole lot (see handle_event).
+    """
+    def __init__(self, width, height, zoom=1.0, x=0.0, y=0.0, min_zoom=0.02, max_zoom=4.0):
+        self.width = width
+        self.height = height
+        self.zoom = zoom
+        self.x = x
+        self.y = y
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        self.world = None  # (w, h) to keep in view, set by fit()
+        self._drag = None
+
+    def fit(self, world_w, world_h):
+        """Zoom out (never in) until the whole world fits the view"""
+        self.world = (world_w, world_h)
+        self.zoom = min(1.0, self.width / world_w, self.height / world_h)
+        self.x = self.y = 0.0
+
+    def is_identity(self):
+        return self.zoom == 1.0 and self.x == 0 and self.y == 0
+
+    def lod(self):
+        return self.zoom < LOD_ZOOM
+
+    def to_screen(self, x, y):
+        return (x - self.x) * self.zoom, (y - self.y) * self.zoom
+
+    def to_world(self, sx, sy):
+        return sx / self.zoom + self.x, sy / self.zoom + self.y
+
+    def rect(self, x, y, w, h):
+        """World rectangle -> screen pygame.Rect"""
+        sx, sy = self.to_screen(x, y)
+        return pygame.Rect(round(sx), round(sy), max(1, round(w * self.zoom)), max(1, round(h * self.zoom)))
+
+    def view(self):
+        """Visible world rectangle as (x0, y0, x1, y1)"""
+        return self.x, self.y, self.x + self.width / self.zoom, self.y + self.height / self.zoom
+
+    def visible(self, x, y, margin=0):
+        x0, y0, x1, y1 = self.view()
+        return x0 - margin <= x <= x1 + margin and y0 - margin <= y <= y1 + margin
+
+    def visible_slots(self, rows, cols):
+        """(row range, column range) of slots overlapping the view, without a per-slot test"""
+        x0, y0, x1, y1 = self.view()
+        c0 = max(0, int((x0 - ENTRY_ROAD_WIDTH) // COLUMN_PITCH))
+        c1 = min(cols, int((x1 - ENTRY_ROAD_WIDTH) // COLUMN_PITCH) + 1)
+        r0 = max(0, int((y0 - 60) // ROW_PITCH))
+        r1 = min(rows, int((y1 - 60) // ROW_PITCH) + 1)
+        return range(r0, max(r0, r1)), range(c0, max(c0, c1))
+
+    def zoom_at(self, factor, sx, sy):
+        """Zoom by `factor` keeping the world point under screen (sx, sy) fixed"""
+        wx, wy = self.to_world(sx, sy)
+        self.zoom = min(self.max_zoom, max(self.min_zoom, self.zoom * factor))
+        self.x, self.y = wx - sx / self.zoom, wy - sy / self.zoom
+
+    def pan(self, dx, dy):
+        """Move the view by (dx, dy) screen pixels"""
+        self.x += dx / self.zoom
+        self.y += dy / self.zoom
+
+    def handle_event(self, event):
+        """Apply a pygame event; returns True if the camera used it"""
+        if event.type == pygame.MOUSEWHEEL:
+            sx, sy = pygame.mouse.get_pos()
+            self.zoom_at(1.15 ** event.y, sx, sy)
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button in (1, 2, 3):
+            self._drag = event.pos
+        elif event.type == pygame.MOUSEBUTTONUP and event.button in (1, 2, 3):
+            self._drag = None
+        elif event.type == pygame.MOUSEMOTION and self._drag is not None:
+            self.pan(self._drag[0] - event.pos[0], self._drag[1] - event.pos[1])
+            self._drag = event.pos
+        elif event.type == pygame.KEYDOWN and event.key in _PAN_KEYS:
+            dx, dy = _PAN_KEYS[event.key]
+            self.pan(dx * self.width / 4, dy * self.height / 4)
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_HOME and self.world:
+            self.fit(*self.world)
+        else:
+            return False
+        return True
+
+
+_PAN_KEYS = {pygame.K_LEFT: (-1, 0), pygame.K_RIGHT: (1, 0), pygame.K_UP: (0, -1), pygame.K_DOWN: (0, 1)}
@@ -2,19 +2,29 @@
 import random
 
 class Car:
+    __slots__ = ('arrival_time', 'parking_duration', 'slot', 'wait_time', 'x', 'y', 'prev_x', 'prev_y',
+                 'path', 'path_idx', 'parked', 'color', 'park_start_time', 'leaving')
+
     def __init__(self, arrival_time, parking_duration):
+        self.reset(arrival_time, parking_duration)
+
+    def reset(self, arrival_time, parking_duration):
+        """(Re)initialize all fields; used by CarPool to recycle cars"""
         self.arrival_time = arrival_time
         self.parking_duration = parking_duration
         self.slot = None
         self.wait_time = 0
         self.x = 0  # Current x position (for animation)
         self.y = 0  # Current y position (for animation)
+        self.prev_x = 0  # Position one tick earlier (for interpolated drawing)
+        self.prev_y = 0
         self.path = []  # List of (x, y) waypoints to follow
         self.path_idx = 0
         self.parked = False
         self.color = None  # Fixed color to prevent blinking
         self.park_start_time = None  # When the car actually parked
         self.leaving = False  # Whether car is leaving the lot
+        return self
 
     @staticmethod
     def random_car(current_time, mean_duration=10):
@@ -26,8 +36,8 @@ class Car:
         self.path_idx = 0
         if path:
             self.x, self.y = path[0]
+            self.prev_x, self.prev_y = self.x, self.y
         # Assign a fixed color to prevent blinking
-        import random
         colors = [(0, 100, 200), (200, 50, 50), (50, 150, 50), (200, 200, 50)]
         self.color = random.choice(colors)
 
@@ -61,3 +71,79 @@ class Car:
             self.y += speed * dy / dist
         
         return True  # Return True while still moving
+
+
+class CarPool:
+    """Free-list of finished cars, reused instead of allocating new ones"""
+    def __init__(self):
+        self.free = []
+
+    def acquire(self, arrival_time, parking_duration):
+        if self.free:
+            return self.free.pop().reset(arrival_time, parking_duration)
+        return Car(arrival_time, parking_duration)
+
+    def random_car(self, current_time, mean_duration=10):
+        duration = random.randint(mean_duration//2, mean_duration*3//2)
+        return self.acquire(current_time, duration)
+
+    def release(self, car):
+        car.path = []  # drop the waypoint list, it is rebuilt on the next set_path
+        self.free.append(car)
+
+
+class CarTable:
+    """Active cars with their leave times, indexed by integer handle.
+
+    Entries are stored densely in `cars` / `leave_times` / `handles`; removal
+    swaps the last entry into the hole, so add and remove are O(1). Iterating
+    positions from the end backwards stays valid while removing.
+    """
+    def __init__(self):
+        self.cars = []
+        self.leave_times = []
+        self.handles = []
+        self.position = {}  # handle -> index into the dense lists
+        self.free_handles = []
+        self.next_handle = 0
+
+    def __len__(self):
+        return len(self.cars)
+
+    def add(self, car, leave_time=None):
+        if self.free_handles:
+            handle = self.free_handles.pop()
+        else:
+            handle = self.next_handle
+            self.next_handle += 1
+        self.position[handle] = len(self.cars)
+        self.cars.append(car)
+        self.leave_times.append(leave_time)
+        self.handles.append(handle)
+        return handle
+
+    def remove_at(self, index):
+        """Remove the entry at a dense index and return its car"""
+        car = self.cars[index]
+        handle = self.handles[index]
+        last = len(self.cars) - 1
+        if index != last:
+            self.cars[index] = self.cars[last]
+            self.leave_times[index] = self.leave_times[last]
+            self.handles[index] = self.handles[last]
+            self.position[self.handles[index]] = index
+        self.cars.pop()
+        self.leave_times.pop()
+        self.handles.pop()
+        del self.position[handle]
+        self.free_handles.append(handle)
+        return car
+
+    def remove(self, handle):
+        return self.remove_at(self.position[handle])
+
+    def get(self, handle):
+        return self.cars[self.position[handle]]
+
+    def clear(self):
+        self.__init__()
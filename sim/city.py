@@ -0,0 +1,237 @@
+# City-wide simulation of many lots sharded across worker processes
+#
+# Every lot runs a headless event-driven engine. Cars turned away from a lot
+# (Metrics.record_fail) drive to the next lot on their route. The coordinator
+# advances all shards in lockstep epochs; overflow cars produced during an
+# epoch are exchanged in one batch per shard at the epoch boundary. Because the
+# drive to another lot takes at least one epoch, no shard ever receives a car
+# in its past (conservative synchronization).
+import heapq
+import random
+import argparse
+import time as _time
+import multiprocessing as mp
+from sim.parking_lot import ParkingLot
+from sim.metrics import Metrics
+
+
+class LotEngine:
+    """Event-driven parking lot without rendering or car animation"""
+    def __init__(self, lot_id, rows=5, cols=10, arrival_rate=1/8, mean_duration=300, seed=0):
+        self.lot_id = lot_id
+        self.lot = ParkingLot(rows, cols)
+        self.metrics = Metrics()
+        self.rng = random.Random(seed)
+        self.arrival_rate = arrival_rate
+        self.mean_duration = mean_duration
+        self.free = [(r, c) for r in range(rows) for c in range(cols)]
+        self.departures = []  # heap of (leave_time, row, col)
+        self.next_arrival = self.rng.expovariate(arrival_rate) if arrival_rate > 0 else float('inf')
+        self.overflow_in = 0
+        self.overflow_parked = 0
+
+    def _duration(self):
+        # Same distribution as Car.random_car
+        m = self.mean_duration
+        return self.rng.randint(m // 2, m * 3 // 2)
+
+    def _release(self, t):
+        while self.departures and self.departures[0][0] <= t:
+            _, row, col = heapq.heappop(self.departures)
+            self.lot.free(row, col)
+            self.free.append((row, col))
+
+    def run_until(self, t_end, incoming=()):
+        """Process own arrivals and `incoming` (time, duration, hops) cars before t_end.
+
+        Returns the turned-away cars as (time, duration, hops) tuples.
+        """
+        incoming = sorted(incoming)
+        outgoing = []
+        i = 0
+        while True:
+            t_in = incoming[i][0] if i < len(incoming) else float('inf')
+            t = min(self.next_arrival, t_in)
+            if t >= t_end:
+                break
+            if t_in < self.next_arrival:
+                _, duration, hops = incoming[i]
+                i += 1
+                self.overflow_in += 1
+            else:
+                duration, hops = self._duration(), 0
+                self.next_arrival += self.rng.expovariate(self.arrival_rate)
+            self._release(t)
+            if self.free:
+                row, col = self.free.pop(self.rng.randrange(len(self.free)))
+                self.lot.occupy(row, col)
+                heapq.heappush(self.departures, (t + duration, row, col))
+                self.metrics.record_park(0)
+                if hops:
+                    self.overflow_parked += 1
+            else:
+                self.metrics.record_fail()
+                outgoing.append((t, duration, hops + 1))
+        self._release(t_end)
+        return outgoing
+
+
+class Shard:
+    """A group of lots owned by one worker"""
+    def __init__(self, specs):
+        self.engines = {spec['lot_id']: LotEngine(**spec) for spec in specs}
+
+    def step(self, t_end, inbox):
+        """Advance every lot to t_end; inbox maps lot_id -> incoming cars.
+
+        Returns a list of (from_lot, time, duration, hops) overflow cars.
+        """
+        outbox = []
+        for lot_id, engine in self.engines.items():
+            for t, duration, hops in engine.run_until(t_end, inbox.get(lot_id, ())):
+                outbox.append((lot_id, t, duration, hops))
+        return outbox
+
+    def summary(self):
+        return {lot_id: {'parked': e.metrics.parked, 'failed': e.metrics.failed,
+                         'overflow_in': e.overflow_in, 'overflow_parked': e.overflow_parked,
+                         'occupancy': e.lot.occupancy_percent()}
+                for lot_id, e in self.engines.items()}
+
+
+def _worker(conn, specs):
+    shard = Shard(specs)
+    while True:
+        msg = conn.recv()
+        if msg is None:
+            conn.send(shard.summary())
+            break
+        t_end, inbox = msg
+        conn.send(shard.step(t_end, inbox))
+    conn.close()
+
+
+def make_city(n_lots, rows=5, cols=10, arrival_rate=1/8, mean_duration=300, seed=0):
+    """Lot specs with demand varying between lots, for benchmarks and examples"""
+    rng = random.Random(seed)
+    return [{'lot_id': i, 'rows': rows, 'cols': cols,
+             'arrival_rate': arrival_rate * rng.uniform(0.5, 1.5),
+             'mean_duration': mean_duration, 'seed': seed * 100003 + i}
+            for i in range(n_lots)]
+
+
+class CitySimulation:
+    """Run lots from `specs` on `workers` processes (0 runs everything in-process).
+
+    `next_lot[i]` is where cars turned away from lot i drive to (default: the
+    next lot id, wrapping around); the drive takes `travel_time` seconds, which
+    must be at least one `epoch`. Cars turned away `max_hops` times give up.
+    """
+    def __init__(self, specs, workers=None, epoch=60.0, travel_time=None, max_hops=3, next_lot=None):
+        self.specs = specs
+        self.workers = mp.cpu_count() if workers is None else workers
+        self.epoch = epoch
+        self.travel_time = epoch if travel_time is None else travel_time
+        if self.travel_time < epoch:
+            raise ValueError("travel_time must be at least one epoch")
+        self.max_hops = max_hops
+        ids = [s['lot_id'] for s in specs]
+        self.next_lot = next_lot or {lot_id: ids[(k + 1) % len(ids)] for k, lot_id in enumerate(ids)}
+        self.lost = 0
+        self.time = 0.0
+
+        n_shards = max(1, self.workers)
+        groups = [specs[k::n_shards] for k in range(n_shards)]
+        self.owner = {spec['lot_id']: k for k, group in enumerate(groups) for spec in group}
+        if self.workers > 0:
+            self.conns = []
+            self.procs = []
+            for group in groups:
+                parent, child = mp.Pipe()
+                proc = mp.Process(target=_worker, args=(child, group), daemon=True)
+                proc.start()
+                child.close()
+                self.conns.append(parent)
+                self.procs.append(proc)
+        else:
+            self.shards = [Shard(groups[0])]
+        self.pending = [dict() for _ in groups]  # per shard: lot_id -> incoming cars
+
+    def _route(self, outboxes):
+        for outbox in outboxes:
+            for from_lot, t, duration, hops in outbox:
+                if hops >= self.max_hops:
+                    self.lost += 1
+                    continue
+                dest = self.next_lot[from_lot]
+                self.pending[self.owner[dest]].setdefault(dest, []).append(
+                    (t + self.travel_time, duration, hops))
+
+    def run(self, horizon):
+        """Advance the whole city by `horizon` seconds"""
+        end = self.time + horizon
+        while self.time < end:
+            t_end = min(self.time + self.epoch, end)
+            inboxes = []
+            for k in range(len(self.pending)):
+                # Cars arriving after this epoch stay queued for a later one
+                now, later = {}, {}
+                for lot_id, cars in self.pending[k].items():
+                    for car in cars:
+                        (now if car[0] < t_end else later).setdefault(lot_id, []).append(car)
+                inboxes.append(now)
+                self.pending[k] = later
+            if self.workers > 0:
+                for conn, inbox in zip(self.conns, inboxes):
+                    conn.send((t_end, inbox))
+                outboxes = [conn.recv() for conn in self.conns]
+            else:
+                outboxes = [self.shards[0].step(t_end, inboxes[0])]
+            self._route(outboxes)
+            self.time = t_end
+
+    def close(self):
+        """Stop the workers and return the aggregated city-wide metrics"""
+        if self.workers > 0:
+            per_lot = {}
+            for conn in self.conns:
+                conn.send(None)
+                per_lot.update(conn.recv())
+            for proc in self.procs:
+                proc.join()
+        else:
+            per_lot = self.shards[0].summary()
+        total_parked = sum(m['parked'] for m in per_lot.values())
+        total_failed = sum(m['failed'] for m in per_lot.values())
+        return {
+            'lots': len(per_lot),
+            'parked': total_parked,
+            'turned_away': total_failed,
+            'lost': self.lost,
+            'overflow_parked': sum(m['overflow_parked'] for m in per_lot.values()),
+            'avg_occupancy': sum(m['occupancy'] for m in per_lot.values()) / max(1, len(per_lot)),
+            'per_lot': per_lot,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Multi-lot city simulation')
+    parser.add_argument('--lots', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (0 = in-process)')
+    parser.add_argument('--hours', type=float, default=24)
+    parser.add_argument('--epoch', type=float, default=60.0, help='synchronization interval in seconds')
+    args = parser.parse_args()
+
+    city = CitySimulation(make_city(args.lots), workers=args.workers, epoch=args.epoch)
+    start = _time.perf_counter()
+    city.run(args.hours * 3600)
+    result = city.close()
+    elapsed = _time.perf_counter() - start
+    print(f"{result['lots']} lots, {args.hours:g}h simulated in {elapsed:.1f}s on {city.workers} workers")
+    print(f"Parked: {result['parked']}  Turned away: {result['turned_away']}  "
+          f"Parked elsewhere: {result['overflow_parked']}  Lost after {city.max_hops} lots: {result['lost']}  "
+          f"Avg occupancy: {result['avg_occupancy']:.1f}%")
+
+
+if __name__ == '__main__':
+    main()
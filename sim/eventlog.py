@@ -0,0 +1,348 @@
+# Compact binary event log of a simulation run with keyframed, seekable playback
+#
+# File layout:
+#   header    MAGIC, version, rows, cols
+#   records   event:    type, time, car id, [payload]
+#             keyframe: type, time, parked, failed, packed grid, car table
+#   footer    keyframe index (time, offset)*, index offset, INDEX_MAGIC
+# A log without footer (crashed run) is still readable; the index is rebuilt
+# by scanning the records once.
+import os
+import math
+import struct
+import bisect
+import argparse
+from sim.parking_lot import ParkingLot
+from sim.car import Car
+from sim.metrics import Metrics
+
+MAGIC = b'PLOG'
+INDEX_MAGIC = b'PIDX'
+VERSION = 2
+
+SPAWN, ASSIGN, PARK, DEPART, FAIL, KEYFRAME = range(1, 7)
+
+_HEADER = struct.Struct('<4sBHH')
+# Times are doubles: float32 steps are coarser than SIM_DT beyond about 3 simulated days
+_EVENT = struct.Struct('<BdI')          # type, time, car id
+_PAYLOAD = {
+    SPAWN: struct.Struct('<f'),         # parking duration
+    ASSIGN: struct.Struct('<HH'),       # row, col
+    PARK: None,
+    DEPART: None,
+    FAIL: None,
+}
+_KEYFRAME = struct.Struct('<BdIII')     # type, time, parked, failed, car count
+_KF_CAR = struct.Struct('<IhhBfd')      # id, row, col, parked, duration, park start
+_INDEX_ENTRY = struct.Struct('<dQ')
+_TRAILER = struct.Struct('<Q4s')
+
+
+def _pack_grid(grid):
+    bits = [v for row in grid for v in row]
+    out = bytearray((len(bits) + 7) // 8)
+    for i, v in enumerate(bits):
+        if v:
+            out[i >> 3] |= 1 << (i & 7)
+    return bytes(out)
+
+
+def _unpack_grid(data, rows, cols):
+    return [[(data[(r * cols + c) >> 3] >> ((r * cols + c) & 7)) & 1 for c in range(cols)]
+            for r in range(rows)]
+
+
+class EventRecorder:
+    """Write simulation events to `path`, with a keyframe every `keyframe_interval` seconds"""
+    def __init__(self, path, rows, cols, keyframe_interval=60.0):
+        self.path = path
+        self.file = open(path, 'wb')
+        self.rows = rows
+        self.cols = cols
+        self.keyframe_interval = keyframe_interval
+        self.next_keyframe = 0.0
+        self.index = []
+        self.ids = {}  # id(car) -> log id, for cars currently in the lot
+        self.next_id = 0
+        self.parked = 0
+        self.failed = 0
+        self.file.write(_HEADER.pack(MAGIC, VERSION, rows, cols))
+
+    def _car_id(self, car):
+        key = id(car)
+        if key not in self.ids:
+            self.ids[key] = self.next_id
+            self.next_id += 1
+        return self.ids[key]
+
+    def _event(self, kind, time, car, *payload):
+        self.file.write(_EVENT.pack(kind, time, self._car_id(car)))
+        if _PAYLOAD[kind] is not None:
+            self.file.write(_PAYLOAD[kind].pack(*payload))
+
+    def spawn(self, time, car):
+        self._event(SPAWN, time, car, car.parking_duration)
+
+    def assign(self, time, car):
+        self.parked += 1
+        self._event(ASSIGN, time, car, *car.slot)
+
+    def park(self, time, car):
+        self._event(PARK, time, car)
+
+    def depart(self, time, car):
+        self._event(DEPART, time, car)
+        self.ids.pop(id(car), None)
+
+    def fail(self, time, car):
+        self.failed += 1
+        self._event(FAIL, time, car)
+        self.ids.pop(id(car), None)
+
+    def tick(self, time, grid, cars):
+        """Write a keyframe if one is due; call once per simulation tick"""
+        if time < self.next_keyframe:
+            return
+        self.next_keyframe = time + self.keyframe_interval
+        self.index.append((time, self.file.tell()))
+        self.file.write(_KEYFRAME.pack(KEYFRAME, time, self.parked, self.failed, len(cars)))
+        self.file.write(_pack_grid(grid))
+        for car in cars:
+            row, col = car.slot if car.slot else (-1, -1)
+            start = car.park_start_time if car.park_start_time is not None else math.nan
+            self.file.write(_KF_CAR.pack(self._car_id(car), row, col, int(car.parked),
+                                         car.parking_duration, start))
+
+    def __getstate__(self):
+        # Pickled to hand the log to another process (sim.runner's process mode),
+        # which reopens the file and continues where this one stopped
+        self.file.flush()
+        state = self.__dict__.copy()
+        state['file'] = None
+        state['offset'] = self.file.tell()
+        return state
+
+    def __setstate__(self, state):
+        offset = state.pop('offset')
+        self.__dict__.update(state)
+        self.file = open(self.path, 'r+b')
+        self.file.seek(offset)
+        self.file.truncate()
+
+    def detach(self):
+        """Stop writing from this process after handing the log to another one"""
+        self.file.close()
+        self.file = None
+
+    def close(self):
+        if self.file is None:
+            return  # detached: the process that took over closes the log
+        index_offset = self.file.tell()
+        for time, offset in self.index:
+            self.file.write(_INDEX_ENTRY.pack(time, offset))
+        self.file.write(_TRAILER.pack(index_offset, INDEX_MAGIC))
+        self.file.close()
+
+
+class EventPlayer:
+    """Reconstruct the lot at any time of a recorded run"""
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        magic, version, self.rows, self.cols = _HEADER.unpack(self.file.read(_HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} event log")
+        self.grid_bytes = (self.rows * self.cols + 7) // 8
+        self.file.seek(0, os.SEEK_END)
+        self.size = self.file.tell()
+        self.end = self.size
+        self._load_index()
+        self.lot = ParkingLot(self.rows, self.cols)
+        self.metrics = Metrics()
+        self.cars = {}
+        self.time = 0.0
+        self.offset = _HEADER.size
+
+    def _load_index(self):
+        self.index = []
+        if self.size >= _HEADER.size + _TRAILER.size:
+            self.file.seek(self.size - _TRAILER.size)
+            index_offset, magic = _TRAILER.unpack(self.file.read(_TRAILER.size))
+            if magic == INDEX_MAGIC:
+                self.end = index_offset
+                self.file.seek(index_offset)
+                data = self.file.read(self.size - _TRAILER.size - index_offset)
+                self.index = list(_INDEX_ENTRY.iter_unpack(data))
+                return
+        # No footer: scan the records once to find the keyframes
+        offset = _HEADER.size
+        while True:
+            record = self._read_record(offset)
+            if record is None:
+                break
+            if record[0] == KEYFRAME:
+                self.index.append((record[1], offset))
+            offset = record[-1]
+
+    def _read_record(self, offset):
+        """Return (type, time, ..., next offset) for the record at offset, or None at the end"""
+        if offset + _EVENT.size > self.end:
+            return None
+        self.file.seek(offset)
+        kind = self.file.read(1)[0]
+        self.file.seek(offset)
+        if kind == KEYFRAME:
+            head = self.file.read(_KEYFRAME.size)
+            if len(head) < _KEYFRAME.size:
+                return None
+            _, time, parked, failed, n_cars = _KEYFRAME.unpack(head)
+            grid = self.file.read(self.grid_bytes)
+            table = self.file.read(n_cars * _KF_CAR.size)
+            if len(grid) < self.grid_bytes or len(table) < n_cars * _KF_CAR.size:
+                return None
+            cars = list(_KF_CAR.iter_unpack(table))
+            return (KEYFRAME, time, parked, failed, grid, cars, self.file.tell())
+        head = self.file.read(_EVENT.size)
+        if len(head) < _EVENT.size:
+            return None
+        kind, time, car_id = _EVENT.unpack(head)
+        payload = ()
+        if _PAYLOAD.get(kind) is not None:
+            data = self.file.read(_PAYLOAD[kind].size)
+            if len(data) < _PAYLOAD[kind].size:
+                return None
+            payload = _PAYLOAD[kind].unpack(data)
+        return (kind, time, car_id, payload, self.file.tell())
+
+    def _load_keyframe(self, record):
+        _, time, parked, failed, grid, cars, _ = record
+        self.lot = ParkingLot(self.rows, self.cols)
+        for r, row in enumerate(_unpack_grid(grid, self.rows, self.cols)):
+            for c, v in enumerate(row):
+                if v:
+                    self.lot.occupy(r, c)
+        self.metrics = Metrics()
+        self.metrics.parked = parked
+        self.metrics.failed = failed
+        self.metrics.rewards = parked - failed
+        self.cars = {}
+        for car_id, row, col, parked_flag, duration, start in cars:
+            car = Car(arrival_time=time, parking_duration=duration)
+            if row >= 0:
+                car.slot = (row, col)
+            car.parked = bool(parked_flag)
+            car.park_start_time = None if math.isnan(start) else start
+            self.cars[car_id] = car
+        self.time = time
+
+    def _apply(self, record):
+        kind, time, car_id, payload, _ = record
+        if kind == SPAWN:
+            self.cars[car_id] = Car(arrival_time=time, parking_duration=payload[0])
+        elif kind == ASSIGN:
+            car = self.cars[car_id]
+            car.slot = payload
+            self.lot.occupy(*payload)
+            self.metrics.record_park(0)
+        elif kind == PARK:
+            car = self.cars[car_id]
+            car.parked = True
+            car.park_start_time = time
+        elif kind == DEPART:
+            car = self.cars.pop(car_id)
+            if car.slot:
+                self.lot.free(*car.slot)
+        elif kind == FAIL:
+            self.cars.pop(car_id, None)
+            self.metrics.record_fail()
+
+    def seek(self, time):
+        """Load the nearest keyframe at or before `time` and replay forward to it"""
+        i = bisect.bisect_right(self.index, (time, float('inf'))) - 1
+        if i >= 0:
+            offset = self.index[i][1]
+            record = self._read_record(offset)
+            self._load_keyframe(record)
+            self.offset = record[-1]
+        else:
+            self.lot = ParkingLot(self.rows, self.cols)
+            self.metrics = Metrics()
+            self.cars = {}
+            self.offset = _HEADER.size
+            self.time = 0.0
+        self.advance_to(time)
+
+    def advance_to(self, time):
+        """Replay events up to `time`; seeks instead when moving backwards"""
+        if time < self.time:
+            self.seek(time)
+            return
+        while True:
+            record = self._read_record(self.offset)
+            if record is None or record[1] > time:
+                break
+            if record[0] == KEYFRAME:
+                self.offset = record[-1]
+                continue
+            self._apply(record)
+            self.offset = record[-1]
+        self.time = time
+
+    def duration(self):
+        return self.index[-1][0] if self.index else 0.0
+
+    def draw(self, screen, camera=None):
+        """Draw the current state with draw_parking_lot; cars are shown at their slots"""
+        from sim.visualization import draw_parking_lot, get_slot_center
+        cars = []
+        for car in self.cars.values():
+            if car.slot:
+                car.x, car.y = get_slot_center(*car.slot)
+                cars.append(car)
+        draw_parking_lot(screen, self.lot, cars, self.time, camera=camera)
+
+    def close(self):
+        self.file.close()
+
+
+def play(path, start=0.0, speed=1.0, fps=30):
+    """Open a window replaying `path` from `start`; left/right arrows jump 60s, wheel/drag zoom and pan"""
+    import pygame
+    from sim.camera import Camera, world_size
+    from sim.game import MAX_VIEW_W, MAX_VIEW_H
+    player = EventPlayer(path)
+    pygame.init()
+    world_w, world_h = world_size(player.rows, player.cols)
+    screen = pygame.display.set_mode((min(world_w, MAX_VIEW_W), min(world_h, MAX_VIEW_H)))
+    camera = Camera(*screen.get_size())
+    camera.fit(world_w, world_h)
+    clock = pygame.time.Clock()
+    t = start
+    player.seek(t)
+    running = True
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_RIGHT:
+                t += 60
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_LEFT:
+                t = max(0.0, t - 60)
+            else:
+                camera.handle_event(event)
+        t += speed / fps
+        player.advance_to(t)
+        player.draw(screen, camera)
+        pygame.display.set_caption(f"Replay t={t:.0f}s  parked={player.metrics.parked}  failed={player.metrics.failed}")
+        pygame.display.flip()
+        clock.tick(fps)
+    player.close()
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replay a recorded parking lot event log')
+    parser.add_argument('path')
+    parser.add_argument('--at', type=float, default=0.0, help='start time in seconds')
+    parser.add_argument('--speed', type=float, default=1.0)
+    args = parser.parse_args()
+    play(args.path, args.at, args.speed)
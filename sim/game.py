@@ -1,105 +1,167 @@
 # Main Pygame loop for parking lot simulation
+import os
+import time
 import pygame
 from sim.parking_lot import ParkingLot
-from sim.car import Car
+from sim.car import CarPool, CarTable
 from sim.metrics import Metrics
-from sim.visualization import draw_parking_lot, get_slot_center, SLOT_WIDTH, SLOT_HEIGHT, LANE_WIDTH, ENTRY_ROAD_WIDTH
+from sim.traffic import TrafficModel
+from sim.road_network import RoadNetwork
+from sim.batch_assign import assign_batch
+from sim.arrivals import ArrivalSchedule, PROFILES, DURATIONS
+from sim.visualization import draw_parking_lot, get_font, SLOT_WIDTH, SLOT_HEIGHT, LANE_WIDTH, ENTRY_ROAD_WIDTH
+from sim.camera import Camera, world_size
 import random
 
 ROWS, COLS = 5, 10
 INFO_HEIGHT = 100  # Increased height for separate sections
 SCREEN_W = ENTRY_ROAD_WIDTH + COLS * (SLOT_WIDTH + 10) + 40
 SCREEN_H = 60 + ROWS * (SLOT_HEIGHT + LANE_WIDTH) + 40 + INFO_HEIGHT
+MAX_VIEW_W, MAX_VIEW_H = 1280, 720  # larger lots get a zoom/pan camera (sim.camera)
 FPS = 30
+SIM_DT = 1/FPS  # fixed simulation tick, independent of the frame rate
+CAR_SPEED = 1.5 * FPS  # pixels per simulated second
 
 class Game:
-    def __init__(self):
+    def __init__(self, headless=False, recorder=None, timeseries=None, congestion=True, batch_window=None,
+                 rows=ROWS, cols=COLS, arrivals=None):
+        self.headless = headless
+        self.recorder = recorder  # optional sim.eventlog.EventRecorder
+        self.timeseries = timeseries  # optional sim.timeseries.TimeSeriesRecorder
+        if headless:
+            # Offscreen rendering: no window, no display server needed
+            os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
         pygame.init()
-        self.screen = pygame.display.set_mode((SCREEN_W, SCREEN_H))
-        pygame.display.set_caption('Parking Lot Optimizer')
+        world_w, world_h = world_size(rows, cols)
+        self.screen_w = min(world_w, MAX_VIEW_W)
+        self.screen_h = min(world_h, MAX_VIEW_H) + INFO_HEIGHT
+        if headless:
+            self.screen = pygame.Surface((self.screen_w, self.screen_h))
+        else:
+            self.screen = pygame.display.set_mode((self.screen_w, self.screen_h))
+            pygame.display.set_caption('Parking Lot Optimizer')
+        # Starts showing the whole lot; wheel zooms, drag/arrows pan, Home resets
+        self.camera = Camera(self.screen_w, self.screen_h - INFO_HEIGHT)
+        self.camera.fit(world_w, world_h)
         self.clock = pygame.time.Clock()
-        self.lot = ParkingLot(ROWS, COLS)
+        self.lot = ParkingLot(rows, cols)
+        self.roads = RoadNetwork(rows, cols)
         self.metrics = Metrics()
-        self.cars = []
+        self.pool = CarPool()
+        self.cars = CarTable()  # active cars and their leave times, by handle
+        self.traffic = TrafficModel() if congestion else None
         self.time = 0
-        self.spawn_timer = 0
+        # Poisson arrivals, on average one every 8 seconds, pregenerated in bulk (sim.arrivals)
+        self.arrivals = arrivals or ArrivalSchedule(rate=1/8)
+        if recorder:
+            recorder.tick(self.time, self.lot.grid, self.cars.cars)  # keyframe at t=0, so any time can be sought
+        # With batch_window (seconds) arrivals wait at the gate and are assigned
+        # together by optimal matching (sim.batch_assign) when the window closes
+        self.batch_window = batch_window
+        self.waiting = []
+        self.batch_opened = 0
+        self.slot_distance = self.roads.distance_table() if batch_window else None
         # Use JetBrains Mono font, fallback to default if not found
         try:
             self.font = pygame.font.SysFont("JetBrains Mono", 24)
         except:
             self.font = pygame.font.SysFont(None, 24)
+        self.legend_font = get_font("Arial", 18)
+
+    def config(self):
+        """Constructor arguments for a headless copy of this simulation (sim.runner's process mode)"""
+        return {'recorder': self.recorder, 'timeseries': self.timeseries, 'congestion': self.traffic is not None,
+                'batch_window': self.batch_window, 'rows': self.lot.rows, 'cols': self.lot.cols,
+                'arrivals': self.arrivals}
 
-    def spawn_car(self):
-        car = Car.random_car(self.time)
+    def spawn_car(self, duration=None):
+        if duration is None:
+            car = self.pool.random_car(self.time)
+        else:
+            car = self.pool.acquire(self.time, duration)
+        if self.recorder:
+            self.recorder.spawn(self.time, car)
+        if self.batch_window:
+            if not self.waiting:
+                self.batch_opened = self.time
+            self.waiting.append(car)
+            return
         free_slots = self.lot.get_free_slots()
         if free_slots:
-            slot = random.choice(free_slots)
-            self.lot.occupy(*slot)
-            car.slot = slot
-            # Path: entry road -> lane -> slot
-            entry_x = ENTRY_ROAD_WIDTH // 2
-            entry_y = 30  # Start from top of entry road
-            lane_y = 60 + slot[0] * (SLOT_HEIGHT + LANE_WIDTH) - LANE_WIDTH // 2 + LANE_WIDTH // 2
-            slot_x, slot_y = get_slot_center(slot[0], slot[1])
-            
-            path = [
-                (entry_x, entry_y),    # Start at entry
-                (entry_x, lane_y),     # Move down to correct lane
-                (ENTRY_ROAD_WIDTH - 10, lane_y),  # Move to lane entrance
-                (slot_x - 30, lane_y), # Drive along lane
-                (slot_x, slot_y)       # Turn into parking space
-            ]
-            car.set_path(path)
-            self.metrics.record_park(car.wait_time)
-            # Don't set leave_time here - it will be set when car actually parks
-            self.cars.append({'car': car, 'leave_time': None})
+            self._send_to_slot(car, random.choice(free_slots))
         else:
-            self.metrics.record_fail()
+            self._turn_away(car)
+
+    def assign_waiting(self):
+        """Assign every car waiting at the gate in one matching; the rest are turned away"""
+        durations = [car.parking_duration for car in self.waiting]
+        slots = assign_batch(durations, self.lot.get_free_slots(), self.lot, self.slot_distance)
+        for car, slot in zip(self.waiting, slots):
+            if slot is None:
+                self._turn_away(car)
+            else:
+                car.wait_time += self.time - car.arrival_time  # time spent at the gate
+                self._send_to_slot(car, slot)
+        self.waiting = []
+
+    def _send_to_slot(self, car, slot):
+        self.lot.occupy(*slot)
+        car.slot = slot
+        if self.recorder:
+            self.recorder.assign(self.time, car)
+        # Path: entrance -> main road -> lane -> slot, cached per slot
+        car.set_path(self.roads.entry_path(slot))
+        # Don't set leave_time or record the park here - both happen when the car
+        # actually parks, after any queueing delay
+        self.cars.add(car, None)
+
+    def _turn_away(self, car):
+        self.metrics.record_fail()
+        if self.recorder:
+            self.recorder.fail(self.time, car)
+        self.pool.release(car)
 
     def start_car_exit(self, car):
         """Create exit path for a car leaving its parking spot"""
         if not car.slot:
             return
             
-        slot_x, slot_y = get_slot_center(car.slot[0], car.slot[1])
-        lane_y = 60 + car.slot[0] * (SLOT_HEIGHT + LANE_WIDTH) - LANE_WIDTH // 2 + LANE_WIDTH // 2
-        exit_x = ENTRY_ROAD_WIDTH // 2
-        exit_y = 60 + ROWS * (SLOT_HEIGHT + LANE_WIDTH) + 20  # Exit at bottom
-        
-        # Exit path: slot -> lane -> entry road -> exit
-        exit_path = [
-            (slot_x, slot_y),          # Current position
-            (slot_x - 30, lane_y),     # Move to lane
-            (ENTRY_ROAD_WIDTH - 10, lane_y),  # Drive to entry road
-            (exit_x, lane_y),          # Enter main road
-            (exit_x, exit_y)           # Exit at bottom
-        ]
+        # Exit path: slot -> lane -> main road -> exit
+        exit_path = self.roads.exit_path(car.slot)
         
         car.start_leaving(exit_path)
 
-    def update(self):
-        self.time += 1/FPS
-        self.spawn_timer += 1/FPS
-        # Poisson process: spawn car on average every 8 seconds (slowed down from 3)
-        if self.spawn_timer > random.expovariate(1/8):
-            self.spawn_car()
-            self.spawn_timer = 0
+    def update(self, dt=SIM_DT):
+        self.time += dt
+        for duration in self.arrivals.pop_due(self.time):
+            self.spawn_car(duration)
+        if self.waiting and self.time - self.batch_opened >= self.batch_window:
+            self.assign_waiting()
         
-        # Move cars along their paths
-        for c in list(self.cars):  # Use list() to allow modification during iteration
-            car = c['car']
-            still_moving = car.move_along_path(current_time=self.time)
-            
-            # Update car's current time reference for visualization
-            car.current_time_ref = self.time
+        # Move cars along their paths; walk backwards so removals don't skip entries
+        table = self.cars
+        blocked = self.traffic.blocked(table.cars, dt) if self.traffic else None
+        for i in range(len(table) - 1, -1, -1):
+            car = table.cars[i]
+            leave_time = table.leave_times[i]
+            # Previous position, for interpolating between ticks when drawing
+            car.prev_x, car.prev_y = car.x, car.y
+            if blocked and blocked[i]:
+                # Held up by the car in front or yielding at a lane entrance
+                car.wait_time += dt
+                continue
+            still_moving = car.move_along_path(speed=CAR_SPEED * dt, current_time=self.time)
             
             # Set leave time when car becomes parked
-            if car.parked and c['leave_time'] is None and not car.leaving:
-                c['leave_time'] = self.time + car.parking_duration
+            if car.parked and leave_time is None and not car.leaving:
+                table.leave_times[i] = self.time + car.parking_duration
+                self.metrics.record_park(car.wait_time)
+                if self.recorder:
+                    self.recorder.park(self.time, car)
             
             # Start leaving process when parking time is up
-            elif (c['leave_time'] is not None and 
-                  c['leave_time'] <= self.time and 
+            elif (leave_time is not None and 
+                  leave_time <= self.time and 
                   car.parked and 
                   not car.leaving):
                 self.start_car_exit(car)
@@ -108,28 +170,41 @@ class Game:
             elif car.leaving and not still_moving:
                 if car.slot:
                     self.lot.free(*car.slot)
-                self.cars.remove(c)
+                if self.recorder:
+                    self.recorder.depart(self.time, car)
+                table.remove_at(i)
+                self.pool.release(car)
 
-    def draw_metrics(self):
-        occ = self.lot.occupancy_percent()
+        if self.recorder:
+            self.recorder.tick(self.time, self.lot.grid, table.cars)
+        if self.timeseries:
+            self.timeseries.record_game(self)
+
+    def draw_metrics(self, snapshot=None):
+        if snapshot is None:
+            occ, parked, failed = self.lot.occupancy_percent(), self.metrics.parked, self.metrics.failed
+            avg_wait, rewards = self.metrics.avg_wait(), self.metrics.rewards
+        else:
+            occ, parked, failed = snapshot.occupancy, snapshot.parked, snapshot.failed
+            avg_wait, rewards = snapshot.avg_wait, snapshot.rewards
         
         # Draw background for info section
-        pygame.draw.rect(self.screen, (20, 20, 20), (0, SCREEN_H-INFO_HEIGHT, SCREEN_W, INFO_HEIGHT))
-        pygame.draw.line(self.screen, (100, 100, 100), (0, SCREEN_H-INFO_HEIGHT), (SCREEN_W, SCREEN_H-INFO_HEIGHT), 2)
+        pygame.draw.rect(self.screen, (20, 20, 20), (0, self.screen_h-INFO_HEIGHT, self.screen_w, INFO_HEIGHT))
+        pygame.draw.line(self.screen, (100, 100, 100), (0, self.screen_h-INFO_HEIGHT), (self.screen_w, self.screen_h-INFO_HEIGHT), 2)
         
         # Metrics section
-        metrics_text = f"Occupancy: {occ:.0f}%  Parked: {self.metrics.parked}  Failed: {self.metrics.failed}  Avg wait: {self.metrics.avg_wait():.1f}s  Reward: {self.metrics.rewards}"
+        metrics_text = f"Occupancy: {occ:.0f}%  Parked: {parked}  Failed: {failed}  Avg wait: {avg_wait:.1f}s  Reward: {rewards}"
         metrics_img = self.font.render(metrics_text, True, (255,255,255))
-        self.screen.blit(metrics_img, (10, SCREEN_H-INFO_HEIGHT+10))
+        self.screen.blit(metrics_img, (10, self.screen_h-INFO_HEIGHT+10))
         
         # Separator line between metrics and legend
-        pygame.draw.line(self.screen, (80, 80, 80), (10, SCREEN_H-INFO_HEIGHT+40), (SCREEN_W-10, SCREEN_H-INFO_HEIGHT+40), 1)
+        pygame.draw.line(self.screen, (80, 80, 80), (10, self.screen_h-INFO_HEIGHT+40), (self.screen_w-10, self.screen_h-INFO_HEIGHT+40), 1)
         
         # Legend section
         legend_title = self.font.render("Legend:", True, (200, 200, 200))
-        self.screen.blit(legend_title, (10, SCREEN_H-INFO_HEIGHT+50))
+        self.screen.blit(legend_title, (10, self.screen_h-INFO_HEIGHT+50))
         
-        legend_y = SCREEN_H-INFO_HEIGHT+75
+        legend_y = self.screen_h-INFO_HEIGHT+75
         legend_items = [
             ("Free Space", (255, 255, 255)),
             ("Car", (0, 100, 200)),
@@ -139,24 +214,65 @@ class Game:
         x_offset = 10
         for text, color in legend_items:
             pygame.draw.rect(self.screen, color, (x_offset, legend_y, 15, 10))
-            legend_text = pygame.font.SysFont("Arial", 18).render(text, True, (200, 200, 200))
+            legend_text = self.legend_font.render(text, True, (200, 200, 200))
             self.screen.blit(legend_text, (x_offset + 20, legend_y - 3))
             x_offset += 120
 
-    def run(self):
+    def draw(self, alpha=1.0, snapshot=None):
+        """Draw the live state, or a sim.runner.Snapshot; alpha interpolates car positions"""
+        # Draw main game area (excluding info section)
+        game_surface = self.screen.subsurface((0, 0, self.screen_w, self.screen_h-INFO_HEIGHT))
+        if snapshot is None:
+            draw_parking_lot(game_surface, self.lot, self.cars.cars, self.time, alpha, self.camera)
+        else:
+            draw_parking_lot(game_surface, snapshot.lot(), snapshot.cars, snapshot.time, alpha, self.camera)
+        self.draw_metrics(snapshot)
+
+    def run(self, speed=1.0, mode='inline'):
+        """Run the window at `speed` simulated seconds per wall-clock second.
+
+        'inline' steps the simulation with a fixed-timestep accumulator in the
+        render loop; 'thread' and 'process' run it separately (sim.runner) and
+        only draw the latest snapshot. clock.tick throttles drawing, never ticks.
+        """
+        if mode != 'inline':
+            from sim.runner import run_decoupled
+            run_decoupled(self, speed, mode)
+            return
+        # Cap the backlog so a long stall is dropped instead of frozen through
+        max_backlog = max(0.25, speed * 0.25)
+        accumulator = 0.0
+        last = time.perf_counter()
         running = True
         while running:
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     running = False
-            self.update()
-            # Draw main game area (excluding info section)
-            game_surface = self.screen.subsurface((0, 0, SCREEN_W, SCREEN_H-INFO_HEIGHT))
-            draw_parking_lot(game_surface, self.lot, [c['car'] for c in self.cars])
-            self.draw_metrics()
+                else:
+                    self.camera.handle_event(event)
+            now = time.perf_counter()
+            accumulator = min(accumulator + (now - last) * speed, max_backlog)
+            last = now
+            while accumulator >= SIM_DT:
+                self.update(SIM_DT)
+                accumulator -= SIM_DT
+            self.draw(alpha=accumulator / SIM_DT)
             pygame.display.flip()
             self.clock.tick(FPS)
         pygame.quit()
 
 if __name__ == '__main__':
-    Game().run()
+    import argparse
+    parser = argparse.ArgumentParser(description='Parking lot simulation')
+    parser.add_argument('--speed', type=float, default=1.0, help='simulation speed multiplier, e.g. 10 or 100')
+    parser.add_argument('--mode', choices=['inline', 'thread', 'process'], default='inline')
+    parser.add_argument('--batch-window', type=float, help='assign arrivals together every N seconds')
+    parser.add_argument('--rows', type=int, default=ROWS)
+    parser.add_argument('--cols', type=int, default=COLS)
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='flat', help='arrival rate profile')
+    parser.add_argument('--durations', choices=sorted(DURATIONS), default='uniform')
+    parser.add_argument('--start-hour', type=float, default=0, help='time of day at the start (rush profile)')
+    args = parser.parse_args()
+    arrivals = ArrivalSchedule(PROFILES[args.profile](), args.durations, phase=args.start_hour * 3600)
+    Game(batch_window=args.batch_window, rows=args.rows, cols=args.cols,
+         arrivals=arrivals).run(args.speed, args.mode)
@@ -0,0 +1,142 @@
+# Headless recording of a simulation run to numbered frames or a raw video pipe
+import os
+import sys
+import argparse
+import subprocess
+import pygame
+from sim.game import Game, FPS, ROWS, COLS, SCREEN_W, SCREEN_H
+from sim.eventlog import EventRecorder
+from sim.timeseries import TimeSeriesRecorder
+from sim.memwatch import MemoryMonitor
+from sim.arrivals import ArrivalSchedule, PROFILES, DURATIONS
+
+
+def _surface_bytes(surface):
+    # pygame >= 2.1.3 renamed tostring to tobytes
+    to_bytes = getattr(pygame.image, 'tobytes', None) or pygame.image.tostring
+    return to_bytes(surface, 'RGB')
+
+
+class FrameDirWriter:
+    """Save every frame as a numbered image (frame_000000.png, ...)"""
+    def __init__(self, directory, ext='png'):
+        self.directory = directory
+        self.ext = ext
+        self.count = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, surface):
+        path = os.path.join(self.directory, f"frame_{self.count:06d}.{self.ext}")
+        pygame.image.save(surface, path)
+        self.count += 1
+
+    def close(self):
+        pass
+
+
+class RawPipeWriter:
+    """Stream raw RGB24 frames to a binary file object (stdout, a pipe, ...)"""
+    def __init__(self, stream, process=None):
+        self.stream = stream
+        self.process = process
+        self.count = 0
+
+    def write(self, surface):
+        self.stream.write(_surface_bytes(surface))
+        self.count += 1
+
+    def close(self):
+        self.stream.flush()
+        if self.process is not None:
+            self.stream.close()
+            self.process.wait()
+
+
+def ffmpeg_writer(path, fps=FPS, size=(SCREEN_W, SCREEN_H)):
+    """Pipe raw frames into an ffmpeg process encoding to `path`"""
+    cmd = ['ffmpeg', '-y', '-loglevel', 'error',
+           '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f"{size[0]}x{size[1]}", '-r', str(fps),
+           '-i', '-', '-pix_fmt', 'yuv420p', path]
+    process = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+    return RawPipeWriter(process.stdin, process)
+
+
+def record(game, ticks, writer, every=1, monitor=None):
+    """Advance `game` by `ticks` simulation ticks without frame-rate throttling.
+
+    Only every `every`-th tick is drawn and handed to `writer`, so the cost of
+    a long run is dominated by the simulation itself. An optional
+    sim.memwatch.MemoryMonitor is sampled along the way. Returns the frame count.
+    """
+    frames = 0
+    try:
+        for tick in range(ticks):
+            game.update()
+            if tick % every == 0:
+                game.draw()
+                writer.write(game.screen)
+                frames += 1
+                if monitor:
+                    monitor.maybe_sample()
+    finally:
+        writer.close()
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Record a headless parking lot run')
+    parser.add_argument('--seconds', type=float, default=3600, help='simulated seconds to record')
+    parser.add_argument('--every', type=int, default=FPS, help='draw one frame every N ticks')
+    parser.add_argument('--frames', help='directory for numbered PNG frames')
+    parser.add_argument('--video', help='output video file (needs ffmpeg on PATH)')
+    parser.add_argument('--raw', action='store_true', help='write raw RGB24 frames to stdout')
+    parser.add_argument('--log', help='also write a binary event log (see sim.eventlog)')
+    parser.add_argument('--timeseries', help='directory for per-tick metric chunks (see sim.timeseries)')
+    parser.add_argument('--rows', type=int, default=ROWS)
+    parser.add_argument('--cols', type=int, default=COLS)
+    parser.add_argument('--zoom', type=float, help='camera zoom (default: fit the whole lot)')
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='flat', help='arrival rate profile')
+    parser.add_argument('--durations', choices=sorted(DURATIONS), default='uniform')
+    parser.add_argument('--start-hour', type=float, default=0, help='time of day at the start (rush profile)')
+    parser.add_argument('--seed', type=int, help='seed for the arrival schedule')
+    parser.add_argument('--batch-window', type=float, help='assign arrivals together every N seconds')
+    parser.add_argument('--mem-budget', type=float, help='fail if memory grows faster than this many MiB per hour')
+    args = parser.parse_args()
+
+    recorder = EventRecorder(args.log, args.rows, args.cols) if args.log else None
+    timeseries = TimeSeriesRecorder(args.timeseries, args.rows * args.cols) if args.timeseries else None
+    arrivals = ArrivalSchedule(PROFILES[args.profile](), args.durations, seed=args.seed,
+                               phase=args.start_hour * 3600)
+    game = Game(headless=True, recorder=recorder, timeseries=timeseries, batch_window=args.batch_window,
+                rows=args.rows, cols=args.cols, arrivals=arrivals)
+    if args.zoom:
+        game.camera.zoom = args.zoom
+
+    if args.frames:
+        writer = FrameDirWriter(args.frames)
+    elif args.video:
+        # Play back at real time relative to the sampled ticks
+        writer = ffmpeg_writer(args.video, fps=max(1, round(FPS / args.every)), size=game.screen.get_size())
+    elif args.raw:
+        writer = RawPipeWriter(sys.stdout.buffer)
+    else:
+        parser.error('one of --frames, --video or --raw is required')
+
+    monitor = None
+    if args.mem_budget is not None:
+        monitor = MemoryMonitor(interval=10.0, budget_per_hour=args.mem_budget * 2**20)
+        monitor.track('env', lambda: (game.lot, game.cars, game.metrics))
+        monitor.track('renderer', lambda: game.screen)
+    frames = record(game, int(args.seconds * FPS), writer, every=args.every, monitor=monitor)
+    if monitor:
+        print(monitor.report(), file=sys.stderr)
+    if recorder:
+        recorder.close()
+    if timeseries:
+        timeseries.close()
+    pygame.quit()
+    print(f"Recorded {frames} frames ({args.seconds:.0f}s simulated)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,16 @@
+# Parking lot geometry shared by rendering, the road network and the env (no pygame)
+SLOT_SIZE = 50
+SLOT_WIDTH = 80
+SLOT_HEIGHT = 40
+LANE_WIDTH = 40
+ENTRY_ROAD_WIDTH = 100
+
+def get_slot_center(row, col):
+    # Calculate position based on realistic parking lot layout
+    x = ENTRY_ROAD_WIDTH + col * (SLOT_WIDTH + 10) + SLOT_WIDTH // 2
+    y = 60 + row * (SLOT_HEIGHT + LANE_WIDTH) + SLOT_HEIGHT // 2
+    return x, y
+
+def get_lane_y(row):
+    # Center line of the driving lane along the top of a parking row
+    return 60 + row * (SLOT_HEIGHT + LANE_WIDTH) - LANE_WIDTH // 2 + LANE_WIDTH // 2
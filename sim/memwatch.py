@@ -0,0 +1,168 @@
+# Memory accounting and growth watchdog for long simulation and training runs
+import gc
+import sys
+import time
+import types
+import tracemalloc
+from collections import deque
+
+# tracemalloc records the call stack of every allocation; it is attributed to
+# the innermost frame whose file matches one of these fragments. The network
+# and the replay buffer are measured with track() instead: tracemalloc does not
+# see torch tensor storage, and both live in agent/dqn.py
+SUBSYSTEM_FILES = [
+    ('agent/environment.py', 'env'),
+    ('agent/observation.py', 'env'),
+    ('sim/parking_lot.py', 'env'),
+    ('sim/car.py', 'env'),
+    ('sim/metrics.py', 'env'),
+    ('sim/game.py', 'env'),
+    ('sim/visualization.py', 'renderer'),
+    ('pygame', 'renderer'),
+]
+
+# Object types worth counting with gc; growth here usually means a leak
+COUNTED_TYPES = ('Car', 'ndarray', 'Tensor', 'Font', 'Surface', 'tuple', 'dict', 'list')
+
+
+class MemoryBudgetExceeded(RuntimeError):
+    pass
+
+
+def deep_sizeof(obj, seen=None):
+    """Approximate bytes held by obj, following containers and counting array buffers"""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if hasattr(obj, 'nbytes') and not isinstance(obj, type):  # numpy arrays, our buffers
+        nbytes = obj.nbytes() if callable(obj.nbytes) else obj.nbytes
+        return sys.getsizeof(obj) + nbytes
+    if hasattr(obj, 'element_size') and hasattr(obj, 'nelement'):  # torch tensors
+        return sys.getsizeof(obj) + obj.element_size() * obj.nelement()
+    if hasattr(obj, 'parameters') and callable(obj.parameters):  # torch modules
+        return sum(deep_sizeof(p, seen) for p in obj.parameters())
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, '__dict__'):
+        size += deep_sizeof(vars(obj), seen)
+    elif hasattr(obj, '__slots__'):
+        size += sum(deep_sizeof(getattr(obj, s), seen) for s in obj.__slots__ if hasattr(obj, s))
+    return size
+
+
+def _subsystem(traceback):
+    # Frames run from the oldest to the most recent; the innermost mapped file wins
+    for frame in reversed(traceback):
+        filename = frame.filename.replace('\\', '/')
+        for fragment, name in SUBSYSTEM_FILES:
+            if fragment in filename:
+                return name
+    return 'other'
+
+
+class MemoryMonitor:
+    """Periodically sample memory per subsystem and report growth rates.
+
+    Three sources are combined in each sample:
+      - tracemalloc bytes grouped by SUBSYSTEM_FILES ('alloc:<subsystem>');
+        'alloc:total' is their sum and excludes torch tensor memory
+      - deep sizes of objects registered with track(); these are the figures
+        for the network and the replay buffer ('network', 'replay')
+      - live object counts of COUNTED_TYPES ('count:<type>')
+    With budget_per_hour set (bytes per hour, a number for the total or a dict
+    per key), sample() raises MemoryBudgetExceeded once a growth rate exceeds it.
+    `nframes` is the traceback depth kept per allocation (ignored if tracemalloc
+    is already running); deeper stacks attribute allocations made through
+    library code to the caller in SUBSYSTEM_FILES.
+    """
+    def __init__(self, interval=60.0, budget_per_hour=None, min_samples=5, nframes=8, history=1000):
+        self.interval = interval
+        self.budget_per_hour = budget_per_hour
+        self.min_samples = min_samples
+        self.tracked = {}
+        self.samples = deque(maxlen=history)  # (wall time, {key: value})
+        self.last_sample = None
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(nframes)
+
+    def track(self, name, target):
+        """Register an object (or a function returning it, for objects that get replaced) to size each sample"""
+        self.tracked[name] = target
+
+    def maybe_sample(self):
+        """Sample if `interval` seconds passed since the last one; cheap to call every step"""
+        now = time.monotonic()
+        if self.last_sample is None or now - self.last_sample >= self.interval:
+            return self.sample()
+        return None
+
+    def sample(self):
+        self.last_sample = time.monotonic()
+        values = {}
+        snapshot = tracemalloc.take_snapshot()
+        for stat in snapshot.statistics('traceback'):
+            key = 'alloc:' + _subsystem(stat.traceback)
+            values[key] = values.get(key, 0) + stat.size
+        values['alloc:total'] = sum(v for k, v in values.items() if k.startswith('alloc:'))
+        for name, target in self.tracked.items():
+            obj = target() if isinstance(target, (types.FunctionType, types.MethodType)) else target
+            values[name] = deep_sizeof(obj)
+        counts = dict.fromkeys(COUNTED_TYPES, 0)
+        for obj in gc.get_objects():
+            name = type(obj).__name__
+            if name in counts:
+                counts[name] += 1
+        for name, count in counts.items():
+            values['count:' + name] = count
+        self.samples.append((self.last_sample, values))
+        self._check_budget()
+        return values
+
+    def growth_rates(self):
+        """Least-squares slope per key in units per hour over the kept samples"""
+        if len(self.samples) < 2:
+            return {}
+        times = [t for t, _ in self.samples]
+        t_mean = sum(times) / len(times)
+        var = sum((t - t_mean) ** 2 for t in times)
+        if var == 0:
+            return {}
+        rates = {}
+        for key in self.samples[-1][1]:
+            ys = [v.get(key, 0) for _, v in self.samples]
+            y_mean = sum(ys) / len(ys)
+            slope = sum((t - t_mean) * (y - y_mean) for t, y in zip(times, ys)) / var
+            rates[key] = slope * 3600
+        return rates
+
+    def _check_budget(self):
+        if self.budget_per_hour is None or len(self.samples) < self.min_samples:
+            return
+        rates = self.growth_rates()
+        budgets = self.budget_per_hour
+        if not isinstance(budgets, dict):
+            budgets = {'alloc:total': budgets}
+        for key, budget in budgets.items():
+            if rates.get(key, 0) > budget:
+                raise MemoryBudgetExceeded(
+                    f"{key} grows {rates[key] / 2**20:.1f} MiB/h, budget is {budget / 2**20:.1f} MiB/h")
+
+    def report(self):
+        """Latest value and growth rate per key, largest first"""
+        if not self.samples:
+            return "No memory samples yet"
+        latest = self.samples[-1][1]
+        rates = self.growth_rates()
+        lines = [f"{'key':<22}{'current':>14}{'growth/h':>14}"]
+        for key in sorted(latest, key=lambda k: -abs(latest[k])):
+            if key.startswith('count:'):
+                cur, rate = f"{latest[key]}", f"{rates.get(key, 0):+.0f}"
+            else:
+                cur, rate = f"{latest[key] / 2**20:.2f} MiB", f"{rates.get(key, 0) / 2**20:+.2f} MiB"
+            lines.append(f"{key:<22}{cur:>14}{rate:>14}")
+        return "\n".join(lines)
@@ -1,5 +1,12 @@
 # Live metrics for parking lot
 class Metrics:
+    """Counters for one run.
+
+    In Game, `parked` counts a car when it reaches its slot (after driving in
+    and any congestion delay, which is its wait time), while `failed` counts
+    a car as soon as it is turned away. Cars still driving to their slot are
+    in neither count; ParkingLotEnv records both at the decision.
+    """
     def __init__(self):
         self.parked = 0
         self.failed = 0
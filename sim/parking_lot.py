@@ -4,14 +4,19 @@ class ParkingLot:
         self.rows = rows
         self.cols = cols
         self.grid = [[0 for _ in range(cols)] for _ in range(rows)]  # 0=free, 1=occupied
+        self.occupied = 0  # kept in sync by occupy/free so occupancy is O(1)
 
     def is_free(self, row, col):
         return self.grid[row][col] == 0
 
     def occupy(self, row, col):
+        if self.grid[row][col] == 0:
+            self.occupied += 1
         self.grid[row][col] = 1
 
     def free(self, row, col):
+        if self.grid[row][col] == 1:
+            self.occupied -= 1
         self.grid[row][col] = 0
 
     def get_free_slots(self):
@@ -19,5 +24,4 @@ class ParkingLot:
 
     def occupancy_percent(self):
         total = self.rows * self.cols
-        occ = sum(sum(row) for row in self.grid)
-        return occ / total * 100
+        return self.occupied / total * 100
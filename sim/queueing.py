@@ -0,0 +1,148 @@
+# Analytical Erlang-loss model for parking lot capacity questions
+#
+# A lot with c slots, Poisson arrivals and no waiting room is an M/G/c/c
+# loss system. Its steady state only depends on the mean stay (insensitivity),
+# so blocking and occupancy follow from the offered load a = rate * mean_stay.
+import math
+import argparse
+
+
+def random_car_mean_duration(mean_duration=10):
+    """Mean parking duration of Car.random_car for one or several mean_duration values"""
+    if isinstance(mean_duration, (int, float)):
+        mean_duration = [mean_duration]
+    means = [(m // 2 + m * 3 // 2) / 2 for m in mean_duration]
+    return sum(means) / len(means)
+
+
+def erlang_b(slots, offered_load):
+    """Blocking probability of an M/G/c/c system (stable recursion)"""
+    b = 1.0
+    for k in range(1, slots + 1):
+        b = offered_load * b / (k + offered_load * b)
+    return b
+
+
+def occupancy_distribution(slots, offered_load):
+    """Steady-state P(n occupied slots), a Poisson distribution truncated at slots"""
+    terms = [1.0]
+    for n in range(1, slots + 1):
+        terms.append(terms[-1] * offered_load / n)
+    total = sum(terms)
+    return [t / total for t in terms]
+
+
+def _quantile(dist, q):
+    acc = 0.0
+    for n, p in enumerate(dist):
+        acc += p
+        if acc >= q:
+            return n
+    return len(dist) - 1
+
+
+def estimate(slots, arrival_rate, mean_duration, overhead=0.0, confidence=0.95):
+    """Steady-state estimate for a lot.
+
+    arrival_rate is cars per second, mean_duration the mean parked time in
+    seconds and overhead the extra time a slot is held per car (driving in and
+    out in Game). Returns a dict of estimates and occupancy bounds.
+    """
+    service = mean_duration + overhead
+    load = arrival_rate * service
+    blocking = erlang_b(slots, load)
+    dist = occupancy_distribution(slots, load)
+    mean_occ = load * (1 - blocking)
+    tail = (1 - confidence) / 2
+    return {
+        'slots': slots,
+        'arrival_rate': arrival_rate,
+        'service_time': service,
+        'offered_load': load,
+        'blocking': blocking,
+        'occupancy': mean_occ,
+        'occupancy_percent': mean_occ / slots * 100 if slots else 0,
+        'occupancy_low': _quantile(dist, tail),
+        'occupancy_high': _quantile(dist, 1 - tail),
+        'confidence': confidence,
+    }
+
+
+def blocking_interval(est, horizon, confidence=0.95):
+    """Interval the failure rate of a run of `horizon` seconds should fall in.
+
+    Consecutive arrivals see strongly correlated lot states, so the binomial
+    interval uses an effective sample of one independent draw per service time
+    (capped by the arrival count). This is a heuristic, not an exact bound.
+    """
+    arrivals = est['arrival_rate'] * horizon
+    n_eff = max(1.0, min(arrivals, horizon / est['service_time'] if est['service_time'] else arrivals))
+    z = _z_score(confidence)
+    p = est['blocking']
+    # Wilson score interval
+    denom = 1 + z * z / n_eff
+    centre = (p + z * z / (2 * n_eff)) / denom
+    half = z * math.sqrt(p * (1 - p) / n_eff + z * z / (4 * n_eff * n_eff)) / denom
+    low, high = centre - half, centre + half
+    # For p at 0 or 1 the bound is exactly 0 or 1; don't let rounding exclude it
+    if low < 1e-12:
+        low = 0.0
+    if high > 1 - 1e-12:
+        high = 1.0
+    return low, high
+
+
+def _z_score(confidence):
+    # Inverse normal CDF by bisection on erf, fine for the handful of calls we make
+    target = (1 + confidence) / 2
+    lo, hi = 0.0, 10.0
+    for _ in range(60):
+        mid = (lo + hi) / 2
+        if 0.5 * (1 + math.erf(mid / math.sqrt(2))) < target:
+            lo = mid
+        else:
+            hi = mid
+    return (lo + hi) / 2
+
+
+def check_simulation(est, metrics, horizon, occupancy_percent=None, confidence=0.95):
+    """Compare a finished simulation (sim.metrics.Metrics) with the model.
+
+    Returns a dict with the observed and expected failure rate and whether the
+    run is consistent with the model. When it is, further simulations of the
+    same configuration are not needed for blocking estimates.
+    """
+    total = metrics.parked + metrics.failed
+    observed = metrics.failed / total if total else 0.0
+    low, high = blocking_interval(est, horizon, confidence)
+    result = {
+        'observed_blocking': observed,
+        'expected_blocking': est['blocking'],
+        'blocking_low': low,
+        'blocking_high': high,
+        'within': low <= observed <= high,
+    }
+    if occupancy_percent is not None:
+        result['observed_occupancy_percent'] = occupancy_percent
+        result['expected_occupancy_percent'] = est['occupancy_percent']
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Erlang-loss estimate for a parking lot')
+    parser.add_argument('--slots', type=int, default=50)
+    parser.add_argument('--interarrival', type=float, default=8.0, help='mean seconds between arrivals')
+    parser.add_argument('--mean-duration', type=int, default=10, help='mean_duration passed to Car.random_car')
+    parser.add_argument('--overhead', type=float, default=0.0, help='seconds a slot is held besides parking')
+    args = parser.parse_args()
+
+    est = estimate(args.slots, 1 / args.interarrival,
+                   random_car_mean_duration(args.mean_duration), args.overhead)
+    print(f"Offered load: {est['offered_load']:.2f} Erlang")
+    print(f"Blocking probability: {est['blocking']:.4%}")
+    print(f"Occupancy: {est['occupancy_percent']:.1f}% "
+          f"({est['occupancy_low']}-{est['occupancy_high']} slots at {est['confidence']:.0%})")
+
+
+if __name__ == '__main__':
+    main()
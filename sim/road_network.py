@@ -0,0 +1,153 @@
+# Road graph of a parking lot with shortest entry/exit paths precomputed per slot
+import heapq
+import math
+from sim.layout import SLOT_WIDTH, SLOT_HEIGHT, LANE_WIDTH, ENTRY_ROAD_WIDTH, get_slot_center, get_lane_y
+
+COLUMN_PITCH = SLOT_WIDTH + 10
+
+
+class RoadNetwork:
+    """Entrances, exits, road/lane nodes and slot nodes as a weighted graph.
+
+    Shortest paths from the entrances to every slot and from every slot to the
+    exits are computed once (Dijkstra) and cached, so spawning a car is a
+    lookup. `entrances`/`exits` are (x, y) points attached to the nearest road
+    node; `row_lengths` gives the number of slots per row for irregular lots.
+    """
+    def __init__(self, rows, cols, entrances=None, exits=None, row_lengths=None):
+        self.rows = rows
+        self.cols = cols
+        self.row_lengths = list(row_lengths) if row_lengths else [cols] * rows
+        road_x = ENTRY_ROAD_WIDTH // 2
+        if entrances is None:
+            entrances = [(road_x, 30)]
+        if exits is None:
+            exits = [(road_x, 60 + rows * (SLOT_HEIGHT + LANE_WIDTH) + 20)]
+
+        self.nodes = []  # (x, y) per node id
+        self.adj = []    # [(neighbour, length)] per node id
+        self._ids = {}
+        self.slot_nodes = {}
+        self._build(road_x)
+        slot_ids = set(self.slot_nodes.values())
+        road_nodes = [n for n in range(len(self.nodes)) if n not in slot_ids]
+        self.entrances = [self._attach(p, road_nodes) for p in entrances]
+        self.exits = [self._attach(p, road_nodes) for p in exits]
+        self._precompute()
+
+    def _node(self, x, y):
+        key = (x, y)
+        if key not in self._ids:
+            self._ids[key] = len(self.nodes)
+            self.nodes.append(key)
+            self.adj.append([])
+        return self._ids[key]
+
+    def _edge(self, a, b):
+        (ax, ay), (bx, by) = self.nodes[a], self.nodes[b]
+        length = math.hypot(bx - ax, by - ay)
+        self.adj[a].append((b, length))
+        self.adj[b].append((a, length))
+
+    def _build(self, road_x):
+        # Main road: one node where each lane meets it
+        road = [self._node(road_x, get_lane_y(r)) for r in range(self.rows)]
+        for a, b in zip(road, road[1:]):
+            self._edge(a, b)
+        # Lanes: entrance from the road, then one node in front of each slot
+        lane_nodes = {}
+        for r in range(self.rows):
+            lane_y = get_lane_y(r)
+            prev = self._node(ENTRY_ROAD_WIDTH - 10, lane_y)
+            self._edge(road[r], prev)
+            for c in range(self.row_lengths[r]):
+                slot_x, _ = get_slot_center(r, c)
+                node = self._node(slot_x - 30, lane_y)
+                self._edge(prev, node)
+                lane_nodes[(r, c)] = node
+                prev = node
+        # Slots hang off their lane node; they are dead ends, never through-roads
+        for slot, lane in lane_nodes.items():
+            node = self._node(*get_slot_center(*slot))
+            self._edge(lane, node)
+            self.slot_nodes[slot] = node
+
+    def _attach(self, point, candidates):
+        node = self._node(*point)
+        if len(self.adj[node]) == 0:
+            nearest = min(candidates, key=lambda n: math.dist(self.nodes[n], point))
+            self._edge(node, nearest)
+        return node
+
+    def _dijkstra(self, source):
+        dist = [math.inf] * len(self.nodes)
+        prev = [-1] * len(self.nodes)
+        slot_ids = set(self.slot_nodes.values())
+        dist[source] = 0.0
+        heap = [(0.0, source)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            if u in slot_ids and u != source:
+                continue  # don't route through parking spaces
+            for v, length in self.adj[u]:
+                nd = d + length
+                if nd < dist[v]:
+                    dist[v] = nd
+                    prev[v] = u
+                    heapq.heappush(heap, (nd, v))
+        return dist, prev
+
+    def _path(self, prev, target):
+        path = []
+        while target != -1:
+            path.append(self.nodes[target])
+            target = prev[target]
+        path.reverse()
+        return _simplify(path)
+
+    def _precompute(self):
+        self.entry_paths, self.entry_distance = {}, {}
+        self.exit_paths, self.exit_distance = {}, {}
+        for entrance in self.entrances:
+            dist, prev = self._dijkstra(entrance)
+            for slot, node in self.slot_nodes.items():
+                if dist[node] < self.entry_distance.get(slot, math.inf):
+                    self.entry_distance[slot] = dist[node]
+                    self.entry_paths[slot] = self._path(prev, node)
+        for exit_node in self.exits:
+            # The graph is undirected: paths from the exit, reversed, lead out of each slot
+            dist, prev = self._dijkstra(exit_node)
+            for slot, node in self.slot_nodes.items():
+                if dist[node] < self.exit_distance.get(slot, math.inf):
+                    self.exit_distance[slot] = dist[node]
+                    self.exit_paths[slot] = self._path(prev, node)[::-1]
+
+    def entry_path(self, slot):
+        """Waypoints from the closest entrance into `slot` (shared list, do not modify)"""
+        return self.entry_paths[slot]
+
+    def exit_path(self, slot):
+        """Waypoints from `slot` to the closest exit (shared list, do not modify)"""
+        return self.exit_paths[slot]
+
+    def distance(self, slot):
+        """Driving distance in pixels from the closest entrance to `slot`"""
+        return self.entry_distance[slot]
+
+    def distance_table(self):
+        """Entry distance per slot in column widths, relative to the closest slot"""
+        base = min(self.entry_distance.values())
+        return {slot: (d - base) / COLUMN_PITCH for slot, d in self.entry_distance.items()}
+
+
+def _simplify(path):
+    # Drop waypoints lying on a straight line between their neighbours
+    out = path[:1]
+    for i in range(1, len(path) - 1):
+        (ax, ay), (bx, by), (cx, cy) = out[-1], path[i], path[i + 1]
+        if (bx - ax) * (cy - by) != (by - ay) * (cx - bx):
+            out.append(path[i])
+    out.extend(path[-1:] if len(path) > 1 else [])
+    return out
@@ -0,0 +1,183 @@
+# Simulation decoupled from rendering: run Game ticks on a thread or process and
+# draw the latest published snapshot with interpolated car positions
+import time
+import threading
+import multiprocessing as mp
+import pygame
+from sim.parking_lot import ParkingLot
+from sim.game import Game, SIM_DT, FPS
+
+PUBLISH_INTERVAL = 1 / 60  # wall seconds between snapshots; drawing never needs more
+MAX_BATCH = 2000  # ticks simulated between checks of the wall clock
+
+
+class CarSprite:
+    """The drawable part of a Car, as stored in a snapshot"""
+    __slots__ = ('prev_x', 'prev_y', 'x', 'y', 'parked', 'leaving', 'park_start_time',
+                 'parking_duration', 'color')
+
+    def __init__(self, car):
+        self.prev_x, self.prev_y, self.x, self.y = car.prev_x, car.prev_y, car.x, car.y
+        self.parked, self.leaving = car.parked, car.leaving
+        self.park_start_time, self.parking_duration = car.park_start_time, car.parking_duration
+        self.color = car.color
+
+
+class Snapshot:
+    """Copy of everything the renderer needs from one simulation tick (picklable)"""
+    __slots__ = ('time', 'rows', 'cols', 'grid', 'cars', 'occupancy', 'parked', 'failed',
+                 'avg_wait', 'rewards')
+
+    def __init__(self, game):
+        self.time = game.time
+        self.rows, self.cols = game.lot.rows, game.lot.cols
+        self.grid = [row[:] for row in game.lot.grid]
+        self.cars = [CarSprite(car) for car in game.cars.cars]
+        self.occupancy = game.lot.occupancy_percent()
+        self.parked, self.failed = game.metrics.parked, game.metrics.failed
+        self.avg_wait, self.rewards = game.metrics.avg_wait(), game.metrics.rewards
+
+    def lot(self):
+        lot = ParkingLot(self.rows, self.cols)
+        lot.grid = self.grid
+        lot.occupied = sum(sum(row) for row in self.grid)
+        return lot
+
+
+def _simulate(game, speed, publish, stopped):
+    """Tick `game` at `speed` x real time until stopped, publishing snapshots"""
+    start = time.perf_counter()
+    ticks = 0
+    last_publish = 0.0
+    # As in Game.run: when the simulation can't keep up, drop the backlog beyond
+    # a quarter second (of simulated time at speed 1) instead of chasing it forever
+    max_due = max(1, int(max(0.25, speed * 0.25) / SIM_DT))
+    while not stopped():
+        now = time.perf_counter()
+        due = int((now - start) * speed / SIM_DT) - ticks
+        if due > max_due:
+            ticks += due - max_due
+            due = max_due
+        if due <= 0:
+            time.sleep(min(SIM_DT / speed, PUBLISH_INTERVAL))
+            continue
+        for _ in range(min(due, MAX_BATCH)):
+            game.update(SIM_DT)
+        ticks += min(due, MAX_BATCH)
+        if now - last_publish >= PUBLISH_INTERVAL:
+            publish(Snapshot(game), time.perf_counter())
+            last_publish = now
+
+
+class SimulationThread(threading.Thread):
+    """Run the simulation of `game` on a background thread"""
+    def __init__(self, game, speed):
+        super().__init__(daemon=True)
+        self.game = game
+        self.speed = speed
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.snapshot = None
+        self.published_at = 0.0
+
+    def _publish(self, snapshot, published_at):
+        with self.lock:
+            self.snapshot, self.published_at = snapshot, published_at
+
+    def run(self):
+        _simulate(self.game, self.speed, self._publish, self.stop_event.is_set)
+
+    def latest(self):
+        with self.lock:
+            return self.snapshot, self.published_at
+
+    def stop(self):
+        self.stop_event.set()
+        self.join()
+
+
+def _process_main(conn, speed, config):
+    game = Game(headless=True, **config)
+
+    def publish(snapshot, published_at):
+        conn.send((snapshot, published_at))
+
+    _simulate(game, speed, publish, conn.poll)  # any message from the parent means stop
+    if game.recorder:
+        game.recorder.close()
+    if game.timeseries:
+        game.timeseries.close()
+    conn.send(('final', game.time, game.metrics, game.lot))
+    conn.close()
+
+
+class SimulationProcess:
+    """Run a headless copy of `game` in a child process, streaming snapshots over a pipe.
+
+    The child gets the game's whole configuration (arrival schedule, batch
+    window, congestion) and takes over its event recorder and time series,
+    which it closes when stopped. stop() copies the final time, metrics and
+    lot back into `game`; the individual cars stay in the child.
+    """
+    def __init__(self, game, speed):
+        self.game = game
+        self.conn, child = mp.Pipe()
+        if game.timeseries:
+            game.timeseries.flush()  # the child continues with an empty buffer
+        ctx = mp.get_context('spawn')  # args are pickled, so the recorder is handed over cleanly
+        self.process = ctx.Process(target=_process_main, args=(child, speed, game.config()), daemon=True)
+        self.snapshot = None
+        self.published_at = 0.0
+
+    def start(self):
+        self.process.start()
+        if self.game.recorder:
+            self.game.recorder.detach()
+
+    def latest(self):
+        # Drain the pipe and keep only the newest snapshot
+        while self.conn.poll():
+            self.snapshot, self.published_at = self.conn.recv()
+        if self.snapshot is not None:
+            self.game.time = self.snapshot.time
+        return self.snapshot, self.published_at
+
+    def stop(self):
+        self.conn.send(None)
+        try:
+            while True:
+                message = self.conn.recv()
+                if message[0] == 'final':
+                    _, self.game.time, self.game.metrics, self.game.lot = message
+                    break
+        except EOFError:
+            pass  # the child died; keep the last snapshot's time
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+def run_decoupled(game, speed=1.0, mode='thread'):
+    """Window loop drawing the latest snapshot; the simulation never waits for it"""
+    if mode == 'thread':
+        sim = SimulationThread(game, speed)
+    else:
+        sim = SimulationProcess(game, speed)
+    sim.start()
+    # A tick lasts SIM_DT / speed wall seconds; interpolate across the newest one
+    tick_wall = SIM_DT / speed
+    running = True
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            else:
+                game.camera.handle_event(event)
+        snapshot, published_at = sim.latest()
+        if snapshot is not None:
+            alpha = min(1.0, (time.perf_counter() - published_at) / tick_wall)
+            game.draw(alpha=alpha, snapshot=snapshot)
+            pygame.display.flip()
+        game.clock.tick(FPS)
+    sim.stop()
+    pygame.quit()
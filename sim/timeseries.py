@@ -0,0 +1,116 @@
+# Per-tick time-series recording to append-only .npz chunks, and an incremental reader
+import os
+import glob
+import time as _time
+import numpy as np
+
+SCALARS = {
+    'time': np.float64,
+    'occupancy': np.float32,   # percent
+    'arrivals': np.int64,      # cumulative
+    'failures': np.int64,      # cumulative
+    'loss': np.float32,        # NaN when not training
+    'epsilon': np.float32,
+}
+# In the training log (train.py) time is the episode index and arrivals and
+# failures are running totals over all episodes
+
+MISSING_SLOT = 255  # 'slots' value of rows recorded without a grid
+
+
+def _chunk_path(directory, seq):
+    return os.path.join(directory, f"chunk_{seq:06d}.npz")
+
+
+def _chunk_seqs(directory):
+    # Sequence numbers of the chunks already in `directory`, ascending
+    names = (os.path.basename(p) for p in glob.glob(os.path.join(directory, 'chunk_*.npz')))
+    return sorted(int(name[len('chunk_'):-len('.npz')]) for name in names
+                  if name[len('chunk_'):-len('.npz')].isdigit())
+
+
+class TimeSeriesRecorder:
+    """Buffer one row per tick in fixed-size arrays and flush them as numbered chunks.
+
+    A chunk is written when the buffer is full or `flush_interval` wall-clock
+    seconds have passed, so a dashboard can follow the run. Chunks are written
+    to a temporary name and renamed, so readers never see partial files.
+    """
+    def __init__(self, directory, n_slots, chunk_size=4096, flush_interval=5.0):
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.flush_interval = flush_interval
+        os.makedirs(directory, exist_ok=True)
+        self.columns = {name: np.zeros(chunk_size, dtype=dtype) for name, dtype in SCALARS.items()}
+        self.slots = np.zeros((chunk_size, n_slots), dtype=np.uint8)
+        self.rows = 0
+        existing = _chunk_seqs(directory)
+        self.seq = existing[-1] + 1 if existing else 0  # after the last chunk, even with gaps
+        self.last_flush = _time.monotonic()
+
+    def record(self, time, occupancy, arrivals, failures, grid=None, loss=np.nan, epsilon=np.nan):
+        i = self.rows
+        c = self.columns
+        c['time'][i] = time
+        c['occupancy'][i] = occupancy
+        c['arrivals'][i] = arrivals
+        c['failures'][i] = failures
+        c['loss'][i] = np.nan if loss is None else loss
+        c['epsilon'][i] = epsilon
+        if grid is not None:
+            self.slots[i] = np.asarray(grid, dtype=np.uint8).ravel()
+        else:
+            self.slots[i] = MISSING_SLOT
+        self.rows += 1
+        if self.rows == self.chunk_size or _time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def record_game(self, game, loss=None, epsilon=np.nan):
+        """Convenience for sim.game.Game and ParkingLotEnv-like objects"""
+        m = game.metrics
+        self.record(game.time, game.lot.occupancy_percent(), m.parked + m.failed, m.failed,
+                    game.lot.grid, loss, epsilon)
+
+    def flush(self):
+        self.last_flush = _time.monotonic()
+        if self.rows == 0:
+            return
+        n = self.rows
+        data = {name: col[:n] for name, col in self.columns.items()}
+        data['slots'] = self.slots[:n]
+        path = _chunk_path(self.directory, self.seq)
+        with open(path + '.tmp', 'wb') as f:
+            np.savez(f, **data)
+        os.replace(path + '.tmp', path)
+        self.seq += 1
+        self.rows = 0
+
+    def close(self):
+        self.flush()
+
+
+class TimeSeriesReader:
+    """Load only the chunks that appeared since the last poll().
+
+    The directory is listed once, for the chunks already there; after that
+    the recorder numbers chunks consecutively, so each poll only checks for
+    the next sequence numbers.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        self.pending = _chunk_seqs(directory) if os.path.isdir(directory) else []
+        self.next_seq = self.pending[-1] + 1 if self.pending else 0
+
+    def poll(self):
+        """Return a dict of concatenated columns for new chunks, or None if there are none"""
+        seqs, self.pending = self.pending, []
+        while os.path.exists(_chunk_path(self.directory, self.next_seq)):
+            seqs.append(self.next_seq)
+            self.next_seq += 1
+        if not seqs:
+            return None
+        parts = []
+        for seq in seqs:
+            with np.load(_chunk_path(self.directory, seq)) as chunk:
+                parts.append({name: chunk[name] for name in chunk.files})
+        return {name: np.concatenate([p[name] for p in parts]) for name in parts[0]}
@@ -0,0 +1,121 @@
+# Lane congestion: cars queue behind each other and yield at merge points
+import math
+
+HASH_MIN_MOVING = 32  # below this many moving cars, checking every pair is cheaper than bucketing
+
+
+class SpatialHash:
+    """Uniform grid of buckets for fixed-radius neighbour queries"""
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = {}
+
+    def clear(self):
+        self.cells.clear()
+
+    def _key(self, x, y):
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def insert(self, item, x, y):
+        self.cells.setdefault(self._key(x, y), []).append(item)
+
+    def query(self, x, y, radius):
+        """Items in all buckets overlapping the square around (x, y); with
+        radius <= cell_size that is at most 3 x 3 buckets"""
+        x0, y0 = self._key(x - radius, y - radius)
+        x1, y1 = self._key(x + radius, y + radius)
+        cells = self.cells
+        found = []
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket:
+                    found.extend(bucket)
+        return found
+
+
+class TrafficModel:
+    """Decide each tick which moving cars have to hold position.
+
+    A car waits when another car travelling the same way is less than `gap`
+    pixels ahead of it in its lane, or when it is about to reach a waypoint
+    (lane entrance, turn out of a slot) that a car closer to that point is
+    using. Oncoming traffic is assumed to use the other half of the lane and
+    is ignored. A car blocked for more than `max_wait` seconds is let through
+    until it reaches its next waypoint, so that rare mutual-yield situations
+    cannot lock the lot.
+    """
+    def __init__(self, gap=45, lane_half_width=15, max_wait=10.0):
+        self.gap = gap
+        self.lane_half_width = lane_half_width
+        self.max_wait = max_wait
+        # Neighbours matter up to 2 * gap away (a car ahead of the merge point), and
+        # cells at least that big keep each query to a 3 x 3 block
+        self.grid = SpatialHash(2 * gap)
+        self.blocked_for = {}  # id(car) -> seconds blocked in a row
+        self.forced = {}  # id(car) -> path index it is allowed to finish unblocked
+
+    def blocked(self, cars, dt):
+        """Return a list of flags, aligned with `cars`, for cars that must not move this tick"""
+        moving = []
+        for i, car in enumerate(cars):
+            if car.parked or not car.path or car.path_idx >= len(car.path) - 1:
+                continue
+            tx, ty = car.path[car.path_idx + 1]
+            dx, dy = tx - car.x, ty - car.y
+            dist = math.hypot(dx, dy) or 1e-9
+            moving.append((i, car, dx / dist, dy / dist, tx, ty, dist))
+        if len(moving) < 2:
+            # Nobody to queue behind or yield to; a forced pass still runs to its waypoint
+            self.blocked_for = {}
+            self.forced = {id(e[1]): e[1].path_idx for e in moving if self.forced.get(id(e[1])) == e[1].path_idx}
+            return [False] * len(cars)
+        use_grid = len(moving) >= HASH_MIN_MOVING
+        if use_grid:
+            self.grid.clear()
+            for k, entry in enumerate(moving):
+                self.grid.insert(k, entry[1].x, entry[1].y)
+        everyone = range(len(moving))
+
+        result = [False] * len(cars)
+        blocked_for = {}
+        forced = {}
+        for k, entry in enumerate(moving):
+            car = entry[1]
+            key = id(car)
+            if self.forced.get(key) == car.path_idx:
+                forced[key] = car.path_idx
+            elif self._must_wait(k, entry, moving,
+                                 self.grid.query(car.x, car.y, 2 * self.gap) if use_grid else everyone):
+                waited = self.blocked_for.get(key, 0.0) + dt
+                if waited <= self.max_wait:
+                    result[entry[0]] = True
+                    blocked_for[key] = waited
+                else:
+                    forced[key] = car.path_idx
+        self.blocked_for = blocked_for
+        self.forced = forced
+        return result
+
+    def _must_wait(self, k, entry, moving, neighbours):
+        _, car, hx, hy, tx, ty, to_target = entry
+        if to_target < 1e-6:
+            return False  # already on the waypoint, only the path index advances
+        gap = self.gap
+        for j in neighbours:
+            if j == k:
+                continue
+            _, other, ohx, ohy, _, _, _ = moving[j]
+            if hx * ohx + hy * ohy < -0.5:
+                continue  # oncoming
+            rx, ry = other.x - car.x, other.y - car.y
+            ahead = rx * hx + ry * hy
+            # Cars at the same spot (e.g. just spawned) queue in table order
+            if (0 < ahead < gap or (ahead == 0 and j < k)) and abs(ry * hx - rx * hy) < self.lane_half_width:
+                return True  # queue behind the car in front
+            if to_target < gap:
+                other_to_target = math.hypot(tx - other.x, ty - other.y)
+                if other_to_target < gap and (other_to_target < to_target or
+                                              (other_to_target == to_target and j < k)):
+                    return True  # yield at the merge point
+        return False
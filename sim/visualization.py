@@ -1,11 +1,7 @@
 # Pygame visualization for parking lot
 import pygame
-
-SLOT_SIZE = 50
-SLOT_WIDTH = 80
-SLOT_HEIGHT = 40
-LANE_WIDTH = 40
-ENTRY_ROAD_WIDTH = 100
+from sim.layout import SLOT_SIZE, SLOT_WIDTH, SLOT_HEIGHT, LANE_WIDTH, ENTRY_ROAD_WIDTH, get_slot_center
+from sim.camera import Camera
 
 COLORS = {
     'asphalt': (45, 45, 45),
@@ -18,98 +14,152 @@ COLORS = {
     'grass': (40, 120, 40),
     'entrance': (200, 200, 200),
     'text': (255, 255, 255),
-    'occupied_tint': (255, 100, 100, 100)
+    'occupied_tint': (255, 100, 100, 100),
+    'lod_free': (200, 200, 200)
 }
 
-def get_slot_center(row, col):
-    # Calculate position based on realistic parking lot layout
-    x = ENTRY_ROAD_WIDTH + col * (SLOT_WIDTH + 10) + SLOT_WIDTH // 2
-    y = 60 + row * (SLOT_HEIGHT + LANE_WIDTH) + SLOT_HEIGHT // 2
-    return x, y
+_fonts = {}
+
+def get_font(name, size):
+    # SysFont lookups are slow; create each font once and reuse it every frame
+    key = (name, size)
+    if key not in _fonts:
+        _fonts[key] = pygame.font.SysFont(name, size)
+    return _fonts[key]
+
+def _identity(screen):
+    return Camera(screen.get_width(), screen.get_height())
+
+def _width(camera, w=2):
+    return max(1, round(w * camera.zoom))
 
 def get_slot_rect(row, col):
     x = ENTRY_ROAD_WIDTH + col * (SLOT_WIDTH + 10)
     y = 60 + row * (SLOT_HEIGHT + LANE_WIDTH)
     return pygame.Rect(x, y, SLOT_WIDTH, SLOT_HEIGHT)
 
-def draw_parking_space(screen, row, col, is_occupied=False):
-    rect = get_slot_rect(row, col)
+def draw_parking_space(screen, row, col, is_occupied=False, camera=None):
+    camera = camera or _identity(screen)
+    world = get_slot_rect(row, col)
+    rect = camera.rect(*world)
+    w = _width(camera)
+    tick = 15 * camera.zoom
     
     # Draw parking space outline (white lines)
-    pygame.draw.rect(screen, COLORS['slot_line'], rect, 2)
+    pygame.draw.rect(screen, COLORS['slot_line'], rect, w)
     
     # Add diagonal lines for better visual
     pygame.draw.line(screen, COLORS['slot_line'], 
                     (rect.left, rect.top), 
-                    (rect.left + 15, rect.top), 2)
+                    (rect.left + tick, rect.top), w)
     pygame.draw.line(screen, COLORS['slot_line'], 
-                    (rect.right - 15, rect.top), 
-                    (rect.right, rect.top), 2)
+                    (rect.right - tick, rect.top), 
+                    (rect.right, rect.top), w)
 
-def draw_lanes(screen, lot):
-    # Draw main driving lanes between parking rows
-    for r in range(lot.rows + 1):
+def draw_lanes(screen, lot, camera=None):
+    # Draw main driving lanes between parking rows; only the visible part of each
+    camera = camera or _identity(screen)
+    rows, cols = camera.visible_slots(lot.rows, lot.cols)
+    if not cols:
+        return
+    x0 = ENTRY_ROAD_WIDTH + cols.start * (SLOT_WIDTH + 10)
+    x1 = ENTRY_ROAD_WIDTH + cols.stop * (SLOT_WIDTH + 10)
+    view_x0, _, view_x1, _ = camera.view()
+    w = _width(camera)
+    for r in range(rows.start, min(lot.rows, rows.stop) + 1):
         y = 60 + r * (SLOT_HEIGHT + LANE_WIDTH) - LANE_WIDTH // 2
-        lane_rect = pygame.Rect(ENTRY_ROAD_WIDTH, y, lot.cols * (SLOT_WIDTH + 10), LANE_WIDTH)
-        pygame.draw.rect(screen, COLORS['asphalt'], lane_rect)
+        pygame.draw.rect(screen, COLORS['asphalt'], camera.rect(x0, y, x1 - x0, LANE_WIDTH))
         
         # Draw lane center line (dashed)
         center_y = y + LANE_WIDTH // 2
-        for x in range(ENTRY_ROAD_WIDTH, ENTRY_ROAD_WIDTH + lot.cols * (SLOT_WIDTH + 10), 30):
+        first = ENTRY_ROAD_WIDTH + max(0, int((view_x0 - ENTRY_ROAD_WIDTH) // 30)) * 30
+        for x in range(first, min(x1, int(view_x1) + 30), 30):
             pygame.draw.line(screen, COLORS['lane_marking'], 
-                           (x, center_y), (x + 15, center_y), 2)
+                           camera.to_screen(x, center_y), camera.to_screen(x + 15, center_y), w)
 
-def draw_entry_road(screen, lot):
+def draw_entry_road(screen, lot, camera=None):
     # Draw main entry road
-    entry_rect = pygame.Rect(0, 0, ENTRY_ROAD_WIDTH, 60 + lot.rows * (SLOT_HEIGHT + LANE_WIDTH))
-    pygame.draw.rect(screen, COLORS['asphalt'], entry_rect)
+    camera = camera or _identity(screen)
+    height = 60 + lot.rows * (SLOT_HEIGHT + LANE_WIDTH)
+    entry_rect = pygame.Rect(0, 0, ENTRY_ROAD_WIDTH, height)
+    if camera.view()[0] > ENTRY_ROAD_WIDTH:
+        return
+    pygame.draw.rect(screen, COLORS['asphalt'], camera.rect(*entry_rect))
     
     # Draw entry road markings
-    for y in range(50, entry_rect.height, 40):
+    _, view_y0, _, view_y1 = camera.view()
+    first = 50 + max(0, int((view_y0 - 50) // 40)) * 40
+    for y in range(first, min(height, int(view_y1) + 40), 40):
         pygame.draw.line(screen, COLORS['lane_marking'], 
-                        (ENTRY_ROAD_WIDTH - 20, y), (ENTRY_ROAD_WIDTH - 20, y + 20), 2)
+                        camera.to_screen(ENTRY_ROAD_WIDTH - 20, y),
+                        camera.to_screen(ENTRY_ROAD_WIDTH - 20, y + 20), _width(camera))
     
+    if camera.lod():
+        return
     # Draw entrance/exit markers
-    font = pygame.font.SysFont("Arial", 16)
+    font = get_font("Arial", 16)
     entrance_text = font.render("ENTRANCE", True, COLORS['text'])
-    screen.blit(entrance_text, (10, 10))
+    screen.blit(entrance_text, camera.to_screen(10, 10))
     
     exit_text = font.render("EXIT", True, COLORS['text'])
-    screen.blit(exit_text, (10, entry_rect.height - 40))
+    screen.blit(exit_text, camera.to_screen(10, height - 40))
 
-def draw_realistic_car(screen, x, y, parking_duration=None, color=None):
+def draw_realistic_car(screen, x, y, parking_duration=None, color=None, camera=None):
     if color is None:
         import random
         colors = [COLORS['car'], COLORS['car_red'], COLORS['car_green'], COLORS['car_yellow']]
         color = random.choice(colors)
+    camera = camera or _identity(screen)
+    z = camera.zoom
     
     car_width, car_height = 60, 30
-    car_rect = pygame.Rect(int(x) - car_width//2, int(y) - car_height//2, car_width, car_height)
+    car_rect = camera.rect(int(x) - car_width // 2, int(y) - car_height // 2, car_width, car_height)
     
     # Car body
     pygame.draw.rect(screen, color, car_rect)
-    pygame.draw.rect(screen, (0, 0, 0), car_rect, 2)
+    pygame.draw.rect(screen, (0, 0, 0), car_rect, _width(camera))
     
     # Windows (darker rectangle)
-    window_rect = pygame.Rect(car_rect.x + 8, car_rect.y + 5, car_width - 16, car_height - 10)
+    window_rect = pygame.Rect(car_rect.x + round(8 * z), car_rect.y + round(5 * z),
+                              round((car_width - 16) * z), round((car_height - 10) * z))
     pygame.draw.rect(screen, (100, 150, 200), window_rect)
     
     # Headlights/taillights
-    pygame.draw.circle(screen, (255, 255, 200), (car_rect.right - 5, car_rect.y + 8), 3)
-    pygame.draw.circle(screen, (255, 255, 200), (car_rect.right - 5, car_rect.bottom - 8), 3)
+    light = max(1, round(3 * z))
+    pygame.draw.circle(screen, (255, 255, 200), (car_rect.right - round(5 * z), car_rect.y + round(8 * z)), light)
+    pygame.draw.circle(screen, (255, 255, 200), (car_rect.right - round(5 * z), car_rect.bottom - round(8 * z)), light)
     
-    # Display parking duration above the car
-    if parking_duration is not None:
-        font = pygame.font.SysFont("Arial", 14)
+    # Display parking duration above the car, if it is big enough to read
+    if parking_duration is not None and z >= 0.75:
+        font = get_font("Arial", 14)
         duration_text = font.render(f"{parking_duration:.0f}s", True, (255, 255, 255))
-        text_rect = duration_text.get_rect(center=(int(x), int(y) - car_height//2 - 15))
+        text_rect = duration_text.get_rect(center=camera.to_screen(int(x), int(y) - car_height // 2 - 15))
         # Add background for better readability
         bg_rect = text_rect.copy()
         bg_rect.inflate(6, 2)
         pygame.draw.rect(screen, (0, 0, 0, 128), bg_rect)
         screen.blit(duration_text, text_rect)
 
-def draw_parking_lot(screen, lot, cars):
+def draw_lod(screen, lot, camera):
+    # Zoomed out: one pixel per visible slot and lane, scaled up in a single blit
+    rows, cols = camera.visible_slots(lot.rows, lot.cols)
+    if not rows or not cols:
+        return
+    cells = pygame.Surface((len(cols), 2 * len(rows)))
+    cells.fill(COLORS['asphalt'])
+    for i, r in enumerate(rows):
+        grid_row = lot.grid[r]
+        for j, c in enumerate(cols):
+            cells.set_at((j, 2 * i), COLORS['car_red'] if grid_row[c] else COLORS['lod_free'])
+    rect = camera.rect(ENTRY_ROAD_WIDTH + cols.start * (SLOT_WIDTH + 10), 60 + rows.start * (SLOT_HEIGHT + LANE_WIDTH),
+                       len(cols) * (SLOT_WIDTH + 10), len(rows) * (SLOT_HEIGHT + LANE_WIDTH))
+    screen.blit(pygame.transform.scale(cells, rect.size), rect.topleft)
+
+def draw_parking_lot(screen, lot, cars, current_time=0, alpha=1.0, camera=None):
+    # alpha in [0, 1] interpolates each car between prev_x/prev_y and x/y.
+    # With a sim.camera.Camera only what is in view is drawn, and when zoomed
+    # out slots become colored cells without cars or text.
+    camera = camera or _identity(screen)
     # Fill background with grass/ground
     screen.fill(COLORS['grass'])
     
@@ -117,30 +167,38 @@ def draw_parking_lot(screen, lot, cars):
     parking_area = pygame.Rect(ENTRY_ROAD_WIDTH - 20, 40, 
                               lot.cols * (SLOT_WIDTH + 10) + 40, 
                               lot.rows * (SLOT_HEIGHT + LANE_WIDTH) + 40)
-    pygame.draw.rect(screen, COLORS['asphalt'], parking_area)
+    pygame.draw.rect(screen, COLORS['asphalt'], camera.rect(*parking_area).clip(screen.get_rect()))
     
     # Draw entry road
-    draw_entry_road(screen, lot)
+    draw_entry_road(screen, lot, camera)
+    
+    if camera.lod():
+        draw_lod(screen, lot, camera)
+        return
     
     # Draw driving lanes
-    draw_lanes(screen, lot)
+    draw_lanes(screen, lot, camera)
     
-    # Draw parking spaces
-    for r in range(lot.rows):
-        for c in range(lot.cols):
+    # Draw parking spaces in view
+    rows, cols = camera.visible_slots(lot.rows, lot.cols)
+    for r in rows:
+        for c in cols:
             is_occupied = not lot.is_free(r, c)
-            draw_parking_space(screen, r, c, is_occupied)
+            draw_parking_space(screen, r, c, is_occupied, camera)
     
-    # Draw cars
+    # Draw cars in view
     for car in cars:
-        if hasattr(car, 'x') and hasattr(car, 'y') and car.x > 0 and car.y > 0:
+        if car.x > 0 and car.y > 0:
+            x = car.prev_x + (car.x - car.prev_x) * alpha if car.prev_x > 0 else car.x
+            y = car.prev_y + (car.y - car.prev_y) * alpha if car.prev_y > 0 else car.y
+            if not camera.visible(x, y, margin=60):
+                continue
             # Use fixed car color to prevent blinking
-            car_color = getattr(car, 'color', COLORS['car'])
+            car_color = car.color or COLORS['car']
             # Show remaining parking time only if car is parked (not leaving)
             if car.parked and not car.leaving and car.park_start_time is not None:
-                current_time = getattr(car, 'current_time_ref', 0)
                 elapsed = current_time - car.park_start_time
                 remaining = max(0, car.parking_duration - elapsed)
-                draw_realistic_car(screen, car.x, car.y, remaining, car_color)
+                draw_realistic_car(screen, x, y, remaining, car_color, camera)
             else:
-                draw_realistic_car(screen, car.x, car.y, None, car_color)
+                draw_realistic_car(screen, x, y, None, car_color, camera)
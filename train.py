@@ -6,26 +6,44 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from agent.dqn import DQNAgent
 from agent.environment import ParkingLotEnv
 from agent.policies import random_policy, nearest_policy
+from sim.timeseries import TimeSeriesRecorder
+from agent.dataset import TransitionDataset, prefill, pretrain
 import numpy as np
 import matplotlib.pyplot as plt
 import torch
 
-def train_dqn_agent(episodes=1000, update_target_freq=100, save_freq=200):
+def train_dqn_agent(episodes=1000, update_target_freq=100, save_freq=200, timeseries_dir=None, memory_monitor=None,
+                    dataset_dir=None, pretrain_steps=0, epsilon=1.0, evaluator=None, eval_freq=100):
     """Train DQN agent on parking lot environment"""
     env = ParkingLotEnv()
+    # One row per episode, readable while training with sim.timeseries.TimeSeriesReader
+    timeseries = TimeSeriesRecorder(timeseries_dir, env.rows * env.cols) if timeseries_dir else None
+    if memory_monitor:
+        # sim.memwatch.MemoryMonitor; raises MemoryBudgetExceeded if a budget is set and exceeded
+        memory_monitor.track('env', env)
+        memory_monitor.track('replay', lambda: agent.memory)
+        memory_monitor.track('network', lambda: agent.q_network)
     agent = DQNAgent(
         state_size=env.get_state_size(),
         action_size=env.get_action_space_size(),
         lr=0.001,
         gamma=0.95,
-        epsilon=1.0,
+        epsilon=epsilon,
         epsilon_decay=0.995,
-        epsilon_min=0.01
+        epsilon_min=0.01,
+        compact_memory=True
     )
+    if dataset_dir:
+        # Logged baseline transitions (agent.dataset) instead of an empty replay buffer
+        dataset = TransitionDataset(dataset_dir)
+        print(f"Prefilled replay memory with {prefill(agent, dataset)} logged transitions")
+        if pretrain_steps:
+            print(f"Pretrained {pretrain_steps} steps, loss {pretrain(agent, dataset, pretrain_steps):.3f}")
     
     scores = []
     occupancies = []
     success_rates = []
+    arrivals_total = failures_total = 0  # cumulative, as sim.timeseries.SCALARS expects
     
     print("Starting DQN training...")
     print(f"State size: {env.get_state_size()}, Action size: {env.get_action_space_size()}")
@@ -56,7 +74,22 @@ def train_dqn_agent(episodes=1000, update_target_freq=100, save_freq=200):
                 break
                 
         # Train the agent
-        agent.train()
+        loss = agent.train()
+        if timeseries:
+            arrivals_total += info['parked'] + info['failed']
+            failures_total += info['failed']
+            timeseries.record(episode, info['occupancy'], arrivals_total, failures_total,
+                              env.lot.grid, loss, agent.epsilon)
+        
+        if memory_monitor:
+            memory_monitor.maybe_sample()
+        
+        if evaluator:
+            # agent.async_eval.AsyncEvaluator: hand off a snapshot, never wait for results
+            if episode % eval_freq == 0:
+                evaluator.submit(episode, agent.q_network)
+            for result in evaluator.poll():
+                print_eval_result(result)
         
         # Update target network periodically
         if episode % update_target_freq == 0:
@@ -84,12 +117,25 @@ def train_dqn_agent(episodes=1000, update_target_freq=100, save_freq=200):
             print(f"  Epsilon: {agent.epsilon:.3f}")
             print()
     
+    if timeseries:
+        timeseries.close()
+    if evaluator:
+        for result in evaluator.close():
+            print_eval_result(result)
+    if memory_monitor:
+        print(memory_monitor.report())
+    
     # Save final model
     os.makedirs('models', exist_ok=True)
     agent.save('models/dqn_parking_final.pth')
     
     return agent, scores, occupancies, success_rates
 
+def print_eval_result(result):
+    best = "  (new best)" if result['best'] else ""
+    print(f"  Eval @ episode {result['episode']}: Reward {result['avg_reward']:.2f}, "
+          f"Occupancy {result['avg_occupancy']:.1f}%, Success {result['avg_success_rate']:.2f}{best}")
+
 def evaluate_policies(episodes=100):
     """Compare different policies"""
     env = ParkingLotEnv()
@@ -107,6 +153,7 @@ def evaluate_policies(episodes=100):
         dqn_agent = DQNAgent(env.get_state_size(), env.get_action_space_size())
         dqn_agent.load('models/dqn_parking_final.pth')
         dqn_agent.epsilon = 0  # No exploration during evaluation
+        dqn_agent.enable_incremental()  # fc1 updated from changed cells only
         policies['DQN'] = dqn_agent
     else:
         print("No trained DQN model found. Skipping DQN evaluation.")